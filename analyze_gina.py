@@ -1,17 +1,12 @@
+import os
+import sys
 import collections
 
-def analyze_patterns():
-    path = r"c:\Users\mohit\ascii-live\frames\gina.go"
-    with open(path, 'r', encoding='utf-8') as f:
-        content = f.read()
-        
-    # Extract lines from string literals again
-    parts = content.split('`')
-    all_lines = []
-    for i in range(1, len(parts), 2):
-        frame_str = parts[i]
-        lines = frame_str.strip().split('\n')
-        all_lines.extend(lines)
+import goframes
+
+def analyze_patterns(path=None):
+    path = path or os.path.join(goframes.FRAMES_DIR, "gina.go")
+    all_lines = goframes.frame_lines(goframes.load_frames(path))
         
     print(f"Total lines: {len(all_lines)}")
     
@@ -21,6 +16,7 @@ def analyze_patterns():
     
     # Find the most common line
     line_counts = collections.Counter(all_lines)
+    print(f"Unique lines: {len(line_counts)} ({len(all_lines) / max(1, len(line_counts)):.1f}x dedup)")
     most_common_line, count = line_counts.most_common(1)[0]
     print(f"Most common line (appears {count} times): {most_common_line[:50]}...")
     
@@ -34,4 +30,4 @@ def analyze_patterns():
         print(f"Common intervals: {collections.Counter(diffs).most_common(5)}")
 
 if __name__ == "__main__":
-    analyze_patterns()
+    analyze_patterns(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,217 @@
+import os
+import re
+import sys
+import zlib
+import mmap
+import struct
+import argparse
+
+# Layout: header, then one ENTRY per frame (the offset table), then the frame
+# records. A record is either a keyframe (the frame's UTF-8 bytes) or a delta
+# against the previous frame: varint(length) followed by the XOR of the two
+# frames, run-length encoded as repeated
+# [varint zero_run][varint literal_len][literal bytes]. With FLAG_ZLIB every
+# record is additionally deflated.
+MAGIC = b"ASCF"
+VERSION = 1
+FLAG_ZLIB = 1
+KIND_KEY = 0
+KIND_DELTA = 1
+HEADER = struct.Struct("<4sHHIIIfI")  # magic, version, flags, width, height, frames, fps, keyframe interval
+ENTRY = struct.Struct("<QIB")  # offset, size, kind
+ZERO_RUN = re.compile(rb"\x00{4,}")
+
+def put_varint(out, n):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+def get_varint(buf, pos):
+    n = 0
+    shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+def xor_bytes(prev, cur):
+    n = len(cur)
+    prev = prev[:n].ljust(n, b"\x00")
+    return (int.from_bytes(prev, "little") ^ int.from_bytes(cur, "little")).to_bytes(n, "little")
+
+def encode_delta(prev, cur):
+    x = xor_bytes(prev, cur)
+    out = bytearray()
+    put_varint(out, len(cur))
+    pos = 0
+    zeros = 0
+    for m in ZERO_RUN.finditer(x):
+        put_varint(out, zeros)
+        put_varint(out, m.start() - pos)
+        out += x[pos:m.start()]
+        zeros = m.end() - m.start()
+        pos = m.end()
+    # Trailing zeros are implied by the length
+    if pos < len(x):
+        put_varint(out, zeros)
+        put_varint(out, len(x) - pos)
+        out += x[pos:]
+    return bytes(out)
+
+def decode_delta(prev, record):
+    n, pos = get_varint(record, 0)
+    x = bytearray()
+    while pos < len(record):
+        zeros, pos = get_varint(record, pos)
+        lit, pos = get_varint(record, pos)
+        x += bytes(zeros)
+        x += record[pos:pos + lit]
+        pos += lit
+    x += bytes(n - len(x))
+    return xor_bytes(prev, bytes(x))
+
+def frame_dims(frames):
+    width = 0
+    height = 0
+    for frame in frames:
+        lines = frame.splitlines()
+        height = max(height, len(lines))
+        for ln in lines:
+            width = max(width, len(ln))
+    return width, height
+
+def write_pack(path, frames, fps=0.0, keyframe_interval=30, compress=True):
+    keyframe_interval = max(1, keyframe_interval)
+    flags = FLAG_ZLIB if compress else 0
+    width, height = frame_dims(frames)
+    records = []
+    prev = None
+    for i, frame in enumerate(frames):
+        cur = frame.encode("utf-8")
+        kind = KIND_KEY
+        record = cur
+        if prev is not None and i % keyframe_interval:
+            delta = encode_delta(prev, cur)
+            if len(delta) < len(cur):
+                kind = KIND_DELTA
+                record = delta
+        if compress:
+            record = zlib.compress(record, 6)
+        records.append((kind, record))
+        prev = cur
+    offset = HEADER.size + ENTRY.size * len(records)
+    table = []
+    for kind, record in records:
+        table.append(ENTRY.pack(offset, len(record), kind))
+        offset += len(record)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, flags, width, height, len(records), float(fps), keyframe_interval))
+        f.write(b"".join(table))
+        for kind, record in records:
+            f.write(record)
+    os.replace(tmp, path)
+    return offset
+
+def is_pack(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+class FramePack:
+    # Random access to a pack: frame i is rebuilt from the nearest keyframe at
+    # or before it, and the last decoded frame is kept so sequential playback
+    # decodes one record per frame.
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, flags, width, height, count, fps, interval = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a frame pack")
+        if version != VERSION:
+            raise ValueError(f"{path}: unsupported frame pack version {version}")
+        self.compressed = bool(flags & FLAG_ZLIB)
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.keyframe_interval = interval
+        self._entries = [ENTRY.unpack_from(self._map, HEADER.size + ENTRY.size * i) for i in range(count)]
+        self._last = (None, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _record(self, i):
+        offset, size, kind = self._entries[i]
+        record = self._map[offset:offset + size]
+        if self.compressed:
+            record = zlib.decompress(record)
+        return kind, record
+
+    def raw(self, i):
+        i = range(len(self._entries))[i]
+        last_i, last = self._last
+        if last_i is not None and last_i <= i and all(self._entries[k][2] == KIND_DELTA for k in range(last_i + 1, i + 1)):
+            start, data = last_i + 1, last
+        else:
+            start = i
+            while self._entries[start][2] != KIND_KEY:
+                start -= 1
+            data = None
+        for k in range(start, i + 1):
+            kind, record = self._record(k)
+            data = record if kind == KIND_KEY else decode_delta(data, record)
+        self._last = (i, data)
+        return data
+
+    def __getitem__(self, i):
+        return self.raw(i).decode("utf-8")
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+def main():
+    p = argparse.ArgumentParser(description="Pack ASCII animation frames into a single indexed, delta-compressed file")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    pk = sub.add_parser("pack", help="Pack a frame glob or blank-line separated file")
+    pk.add_argument("source")
+    pk.add_argument("output")
+    pk.add_argument("--fps", type=float, default=0.0)
+    pk.add_argument("--keyframe", type=int, default=30, help="Store a full frame every N frames")
+    pk.add_argument("--no-zlib", action="store_true")
+    info = sub.add_parser("info", help="Describe a pack")
+    info.add_argument("path")
+    unpack = sub.add_parser("unpack", help="Write a pack back out as a blank-line separated file")
+    unpack.add_argument("path")
+    unpack.add_argument("output")
+    args = p.parse_args()
+
+    if args.cmd == "pack":
+        from play import load_frames_from_single_file, load_frames_from_files
+        if os.path.isfile(args.source):
+            frames = load_frames_from_single_file(args.source)
+        else:
+            frames = load_frames_from_files(args.source)
+        size = write_pack(args.output, frames, args.fps, args.keyframe, not args.no_zlib)
+        raw = sum(len(f.encode("utf-8")) for f in frames)
+        print(f"{len(frames)} frames, {raw} bytes -> {size} bytes ({raw / max(1, size):.1f}x)")
+    elif args.cmd == "info":
+        pack = FramePack(args.path)
+        keys = sum(1 for e in pack._entries if e[2] == KIND_KEY)
+        print(f"frames: {len(pack)} ({keys} keyframes, interval {pack.keyframe_interval})")
+        print(f"size: {pack.width}x{pack.height}, fps: {pack.fps:g}, zlib: {pack.compressed}")
+    else:
+        pack = FramePack(args.path)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write("\n\n".join(pack[i] for i in range(len(pack))))
+        print(f"wrote {len(pack)} frames to {args.output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,36 @@ import os
 import sys
 import time
 import glob
+import fnmatch
 import math
 import argparse
 import subprocess
+import signal
+import threading
+import concurrent.futures
+import io
+import contextlib
+import json
+import pickle
+import hashlib
+import mmap
+import re
+import operator
+import collections
+import bisect
+import itertools
+from array import array
+
+import framepack
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 ESC = "\x1b"
+DEFAULT_RAMP = " .:-=+*#%@"
+NON_SPACE = re.compile(rb"\S")
 
 def enable_windows_ansi():
     if os.name != "nt":
@@ -103,8 +128,11 @@ def get_terminal_size():
     except OSError:
         return 120, 30
 
+def cursor_to(row, col):
+    return f"{ESC}[{row};{col}H"
+
 def move_cursor(row, col):
-    sys.stdout.write(f"{ESC}[{row};{col}H")
+    sys.stdout.write(cursor_to(row, col))
 
 def hide_cursor():
     sys.stdout.write(f"{ESC}[?25l")
@@ -117,12 +145,546 @@ def clear_region(top, left, width, height):
         move_cursor(top + r, left)
         sys.stdout.write(" " * max(0, width))
 
-def load_frames_from_files(pattern):
-    frames = []
-    for file in sorted(glob.glob(pattern)):
-        with open(file, "r", encoding="utf-8") as f:
-            frames.append(f.read())
-    return frames
+def frame_grid(lines, region_w, region_h):
+    rows = [ln[:region_w].ljust(region_w) for ln in lines[:region_h]]
+    while len(rows) < region_h:
+        rows.append(" " * region_w)
+    return rows
+
+def render_full(grid, top, left, color_prefix, reset):
+    region_w = len(grid[0]) if grid else 0
+    parts = []
+    for r in range(len(grid)):
+        parts.append(cursor_to(top + r, left))
+        parts.append(" " * region_w)
+    for r, ln in enumerate(grid):
+        parts.append(cursor_to(top + r, left))
+        parts.append(color_prefix + ln + reset)
+    return "".join(parts)
+
+def changed_runs(old, new, gap):
+    # Spans of differing cells; spans separated by no more than `gap`
+    # unchanged cells are merged, since rewriting them is cheaper than a
+    # fresh cursor move.
+    runs = []
+    n = len(new)
+    j = 0
+    while j < n:
+        if old[j] == new[j]:
+            j += 1
+            continue
+        start = j
+        end = j + 1
+        k = j + 1
+        while k < n and k - end <= gap:
+            if old[k] != new[k]:
+                end = k + 1
+            k += 1
+        runs.append((start, end))
+        j = end
+    return runs
+
+def changed_cells(a, b, a_colors=None, b_colors=None, limit=None):
+    # Number of cells that differ between two equally sized grids, in glyph
+    # or colour; counting stops once past `limit`
+    n = 0
+    for r, (ra, rb) in enumerate(zip(a, b)):
+        if a_colors is None:
+            if ra != rb:
+                n += sum(map(operator.ne, ra, rb))
+        elif ra != rb or a_colors[r] != b_colors[r]:
+            n += sum(1 for x, y, p, q in zip(ra, rb, a_colors[r], b_colors[r]) if x != y or p != q)
+        if limit is not None and n > limit:
+            break
+    return n
+
+def dedup_frames(grids, colors=None, threshold=0):
+    # Collapse runs of consecutive frames that differ from the run's first
+    # frame in at most `threshold` cells (0: only identical frames). Returns
+    # the indices of the frames kept and how many ticks each one is held.
+    keep = []
+    holds = []
+    for i, grid in enumerate(grids):
+        if keep:
+            j = keep[-1]
+            if threshold <= 0:
+                same = grid == grids[j] and (colors is None or colors[i] == colors[j])
+            else:
+                same = changed_cells(grids[j], grid, colors and colors[j], colors and colors[i], threshold) <= threshold
+            if same:
+                holds[-1] += 1
+                continue
+        keep.append(i)
+        holds.append(1)
+    return keep, holds
+
+def minimal_period(items):
+    # Shortest p with items[i] == items[i + p] wherever both exist, from the
+    # KMP failure function in linear time; items must be hashable
+    ids = {}
+    seq = [ids.setdefault(item, len(ids)) for item in items]
+    n = len(seq)
+    if n == 0:
+        return 0
+    fail = [0] * n
+    k = 0
+    for i in range(1, n):
+        while k and seq[i] != seq[k]:
+            k = fail[k - 1]
+        if seq[i] == seq[k]:
+            k += 1
+        fail[i] = k
+    return n - fail[-1]
+
+def cycle_length(items):
+    # Frames in one loop of `items` played on repeat: the minimal period when
+    # the sequence is whole copies of it, else all of them
+    n = len(items)
+    p = minimal_period(items)
+    return p if p and n % p == 0 else n
+
+def render_diff(prev, grid, top, left, color_prefix=""):
+    if prev is None:
+        parts = [color_prefix]
+        for r, ln in enumerate(grid):
+            parts.append(cursor_to(top + r, left))
+            parts.append(ln)
+        return "".join(parts)
+    parts = []
+    for r, ln in enumerate(grid):
+        old = prev[r]
+        if old == ln:
+            continue
+        row = top + r
+        gap = len(cursor_to(row, left + len(ln)))
+        for start, end in changed_runs(old, ln, gap):
+            parts.append(cursor_to(row, left + start))
+            parts.append(ln[start:end])
+    return "".join(parts)
+
+def sgr_change(state, attr):
+    # The SGR that takes the terminal from colours `state` to `attr`, both
+    # (fg, bg) parameter strings; only what changed is sent
+    parts = [new for new, old in zip(attr, state) if new != old]
+    return f"{ESC}[{';'.join(parts)}m" if parts else ""
+
+def render_color_diff(prev, prev_colors, grid, colors, top, left, color_prefix, default_attr):
+    # render_diff for frames with per-cell colours. Cells count as changed
+    # when either the glyph or its colours differ, and an SGR is emitted
+    # only where the colour changes along the output, across rows too. The
+    # payload starts from color_prefix, so it does not depend on what
+    # state the previous payload left behind.
+    parts = [color_prefix]
+    state = default_attr
+    for r, ln in enumerate(grid):
+        crow = colors[r]
+        if prev is None:
+            runs = [(0, len(ln))]
+        else:
+            if prev[r] == ln and prev_colors[r] == crow:
+                continue
+            gap = len(cursor_to(top + r, left + len(ln)))
+            runs = changed_runs(list(zip(prev[r], prev_colors[r])), list(zip(ln, crow)), gap)
+        for start, end in runs:
+            parts.append(cursor_to(top + r, left + start))
+            col = start
+            while col < end:
+                attr = crow[col]
+                run = col + 1
+                while run < end and crow[run] == attr:
+                    run += 1
+                if attr != state:
+                    parts.append(sgr_change(state, attr))
+                    state = attr
+                parts.append(ln[col:run])
+                col = run
+    return "".join(parts)
+
+def compile_frames(grids, top, left, color_prefix, reset, redraw="diff", colors=None, default_attr=None):
+    # Pre-encode everything the playback loop writes. payloads[i] takes the
+    # screen from frame i-1 to frame i (wrapping), intro draws frame 0 from
+    # an unknown screen.
+    if colors is not None:
+        intro = render_color_diff(None, None, grids[0], colors[0], top, left, color_prefix, default_attr).encode("utf-8")
+        if redraw == "full":
+            payloads = [render_color_diff(None, None, g, c, top, left, color_prefix, default_attr).encode("utf-8") for g, c in zip(grids, colors)]
+        else:
+            payloads = [render_color_diff(grids[i - 1], colors[i - 1], grids[i], colors[i], top, left, color_prefix, default_attr).encode("utf-8") for i in range(len(grids))]
+        return intro, payloads
+    if redraw == "full":
+        payloads = [render_full(g, top, left, color_prefix, reset).encode("utf-8") for g in grids]
+        return payloads[0], payloads
+    intro = render_diff(None, grids[0], top, left, color_prefix).encode("utf-8")
+    payloads = [render_diff(grids[i - 1], grids[i], top, left).encode("utf-8") for i in range(len(grids))]
+    return intro, payloads
+
+class CompiledAnimation:
+    # `colors`, when given, holds per frame and row the (fg, bg) SGR
+    # parameters of every cell, with `default_attr` for uncoloured cells.
+    def __init__(self, grids, top, left, color_prefix, reset, redraw="diff", precompile=True, colors=None, default_attr=None, holds=None):
+        self.grids = grids
+        self.top = top
+        self.left = left
+        self.color_prefix = color_prefix
+        self.reset = reset
+        self.redraw = redraw
+        self.colors = colors
+        self.default_attr = default_attr
+        self._cell_prefixes = {}
+        # With `holds`, frame i stays up for holds[i] ticks; `ticks` is the
+        # length of one cycle in ticks either way
+        self.holds = holds
+        self.starts = list(itertools.accumulate([0] + holds[:-1])) if holds else None
+        self.ticks = sum(holds) if holds else len(grids)
+        self.region_h = len(grids[0]) if len(grids) else 0
+        self.region_w = len(grids[0][0]) if self.region_h else 0
+        if precompile:
+            self.intro, self.payloads = compile_frames(grids, top, left, color_prefix, reset, redraw, colors, default_attr)
+        else:
+            self.intro = self.render(None, 0)
+            self.payloads = None
+
+    def __len__(self):
+        return len(self.grids)
+
+    def frame_at(self, tick):
+        # Frame on screen at `tick` (0 <= tick < self.ticks)
+        if self.starts is None:
+            return tick
+        return bisect.bisect_right(self.starts, tick) - 1
+
+    def render(self, shown, target):
+        grid = self.grids[target]
+        if self.colors is not None:
+            prev = None if shown is None or self.redraw == "full" else self.grids[shown]
+            prev_colors = None if prev is None else self.colors[shown]
+            return render_color_diff(prev, prev_colors, grid, self.colors[target], self.top, self.left, self.color_prefix, self.default_attr).encode("utf-8")
+        if self.redraw == "full":
+            return render_full(grid, self.top, self.left, self.color_prefix, self.reset).encode("utf-8")
+        prev = None if shown is None else self.grids[shown]
+        return render_diff(prev, grid, self.top, self.left, self.color_prefix).encode("utf-8")
+
+    def step(self, shown, target):
+        # Bytes that take the screen from frame `shown` to frame `target`.
+        # Consecutive steps are precompiled; skips (dropped frames) and
+        # lazy sources are diffed on the fly.
+        if self.payloads is not None:
+            if self.redraw == "full" or target == (shown + 1) % len(self.payloads):
+                return self.payloads[target]
+        return self.render(shown, target)
+
+    def full_frame(self, i):
+        # What repainting frame i from scratch costs
+        if self.colors is not None:
+            return self.render(None, i)
+        return render_full(self.grids[i], self.top, self.left, self.color_prefix, self.reset).encode("utf-8")
+
+    def cell_prefix(self, attr):
+        # Complete SGR for cells coloured `attr`, for the compositor canvas
+        prefix = self._cell_prefixes.get(attr)
+        if prefix is None:
+            prefix = self._cell_prefixes[attr] = self.color_prefix + sgr_change(self.default_attr, attr)
+        return prefix
+
+class Histogram:
+    # Log-linear buckets in the style of HdrHistogram: exact below 32, then
+    # 16 buckets per power of two (about 6% resolution) up to any value.
+    def __init__(self):
+        self.counts = collections.Counter()
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        if value < 32:
+            idx = value
+        else:
+            e = value.bit_length() - 5
+            idx = e * 16 + (value >> e)
+        self.counts[idx] += 1
+        self.total += 1
+        if value > self.max:
+            self.max = value
+
+    @staticmethod
+    def bucket_value(idx):
+        if idx < 32:
+            return idx
+        e = idx // 16 - 1
+        # Middle of the bucket
+        return ((idx - e * 16) << e) + (1 << e) // 2
+
+    def percentile(self, pct):
+        if not self.total:
+            return 0
+        rank = max(1, int(math.ceil(self.total * pct / 100.0)))
+        seen = 0
+        for idx in sorted(self.counts):
+            seen += self.counts[idx]
+            if seen >= rank:
+                return min(self.bucket_value(idx), self.max)
+        return self.max
+
+class PhaseProfiler:
+    # Per-phase frame timings (nanoseconds from perf_counter_ns) kept in
+    # histograms, dumped as JSON lines every `interval` seconds and once
+    # more on close.
+    PHASES = ("sleep", "render", "write", "flush")
+
+    def __init__(self, path, interval=5.0):
+        self.file = sys.stderr if path == "-" else open(path, "a", encoding="utf-8")
+        self.interval = interval
+        self.hists = {phase: Histogram() for phase in self.PHASES}
+        self.frames = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self.next_dump = self.started + interval if interval else None
+
+    def record(self, phase, ns):
+        self.hists[phase].record(ns)
+
+    def frame(self, nbytes):
+        self.frames += 1
+        self.bytes += nbytes
+        if self.next_dump is not None and time.perf_counter() >= self.next_dump:
+            self.dump()
+            self.next_dump += self.interval
+
+    def summary(self):
+        phases = {}
+        for phase, h in self.hists.items():
+            if h.total:
+                phases[phase] = {
+                    "count": h.total,
+                    "p50_us": h.percentile(50) / 1e3,
+                    "p95_us": h.percentile(95) / 1e3,
+                    "p99_us": h.percentile(99) / 1e3,
+                    "max_us": h.max / 1e3,
+                }
+        return {
+            "elapsed_s": time.perf_counter() - self.started,
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "phases": phases,
+        }
+
+    def dump(self, final=False):
+        record = self.summary()
+        if final:
+            record["final"] = True
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.dump(final=True)
+        if self.file is not sys.stderr:
+            self.file.close()
+
+class FrameScheduler:
+    def __init__(self, fps, policy="drop"):
+        self.period = 1.0 / max(1e-6, fps)
+        self.policy = policy
+        self.frames = 0
+        self.dropped = 0
+        self.mean_interval = 0.0
+        self.m2_interval = 0.0
+        self.max_interval = 0.0
+
+    def start(self, now=None):
+        now = time.perf_counter() if now is None else now
+        self.started = now
+        self.last = now
+        self.deadline = now + self.period
+        self.frames = 1
+
+    def wait(self):
+        # Sleep until the next deadline and return how many frames to
+        # advance. Deadlines are absolute, so render and write time never
+        # accumulate into drift. When more than a whole period late, the
+        # "drop" policy skips the missed frames and "slow" re-anchors the
+        # clock instead.
+        now = time.perf_counter()
+        if now < self.deadline:
+            time.sleep(self.deadline - now)
+            now = time.perf_counter()
+        return self.advance(now)
+
+    def advance(self, now):
+        # The bookkeeping half of wait(), for callers that do their own
+        # sleeping (the compositor shares one sleep between schedulers)
+        steps = 1
+        late = now - self.deadline
+        if late >= self.period:
+            if self.policy == "drop":
+                skipped = int(late // self.period)
+                steps += skipped
+                self.dropped += skipped
+                self.deadline += skipped * self.period
+            else:
+                self.deadline = now
+        self.deadline += self.period
+        self._record(now - self.last)
+        self.last = now
+        return steps
+
+    def _record(self, interval):
+        # Welford's running mean/variance of the frame interval
+        self.frames += 1
+        n = self.frames - 1
+        delta = interval - self.mean_interval
+        self.mean_interval += delta / n
+        self.m2_interval += delta * (interval - self.mean_interval)
+        self.max_interval = max(self.max_interval, interval)
+
+    def summary(self):
+        elapsed = max(1e-9, self.last - self.started)
+        n = self.frames - 1
+        jitter = math.sqrt(self.m2_interval / n) if n > 1 else 0.0
+        return {
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "elapsed": elapsed,
+            "target_fps": 1.0 / self.period,
+            "fps": n / elapsed if n else 0.0,
+            "jitter_ms": jitter * 1000.0,
+            "max_interval_ms": self.max_interval * 1000.0,
+        }
+
+class MmapFrameSource:
+    # Frames of a blank-line separated file, split exactly like
+    # load_frames_from_single_file but indexed in one scan over a memory
+    # map and decoded only when asked for.
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # mmap refuses empty files
+            self._map = b""
+        self._starts = array("Q")
+        self._ends = array("Q")
+        self._index()
+
+    def _index(self):
+        mm = self._map
+        sep = b"\r\n\r\n" if mm.find(b"\r\n", 0, 65536) != -1 else b"\n\n"
+        m = NON_SPACE.search(mm)
+        if m is None:
+            return
+        start = m.start()
+        end = len(mm)
+        while end > start and mm[end - 1:end].isspace():
+            end -= 1
+        pos = start
+        while pos <= end:
+            j = mm.find(sep, pos, end)
+            if j == -1:
+                j = end
+            if NON_SPACE.search(mm, pos, j):
+                self._starts.append(pos)
+                self._ends.append(j)
+            pos = j + len(sep)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __getitem__(self, i):
+        raw = self._map[self._starts[i]:self._ends[i]]
+        return normalize_frame(raw.decode("utf-8").replace("\r\n", "\n"))
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+class LazyFrames:
+    # Sequence view of `source` with `transform` applied per frame on
+    # access, keeping the most recently used results.
+    def __init__(self, source, transform, cache_size=32):
+        self.source = source
+        self.transform = transform
+        self.cache_size = cache_size
+        self._cache = collections.OrderedDict()
+        # A background re-layout may read the same source as playback
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.source)
+
+    def __getitem__(self, i):
+        i = range(len(self.source))[i]
+        with self._lock:
+            hit = self._cache.get(i)
+            if hit is not None:
+                self._cache.move_to_end(i)
+                return hit
+        value = self.transform(self.source[i])
+        with self._lock:
+            self._cache[i] = value
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return value
+
+def sample_indices(n, count=8):
+    return sorted({(k * (n - 1)) // max(1, count - 1) for k in range(count)}) if n else []
+
+def sample_frames(frames, count=8):
+    # A spread of frames to size the region from without decoding them all
+    if len(frames) == 0:
+        return [[""]]
+    return [frames[i] for i in sample_indices(len(frames), count)]
+
+def natural_key(name):
+    # "frame10.txt" sorts after "frame9.txt", however the numbers are padded
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+
+def list_frame_files(pattern):
+    # Files matching `pattern`, in natural order. A plain directory is
+    # listed with a single scandir instead of glob's per-entry work.
+    directory, name = os.path.split(pattern)
+    if any(c in directory for c in "*?["):
+        paths = glob.glob(pattern)
+    else:
+        try:
+            with os.scandir(directory or ".") as entries:
+                paths = [
+                    os.path.join(directory, e.name) for e in entries
+                    if fnmatch.fnmatch(e.name, name) and (name.startswith(".") or not e.name.startswith(".")) and e.is_file()
+                ]
+        except OSError:
+            paths = []
+    return sorted(paths, key=lambda p: natural_key(os.path.basename(p)))
+
+def read_text(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+class FrameFiles:
+    # Frames read from a list of files by a thread pool. Indexing returns
+    # the normalized frame as soon as its own file is in, so playback can
+    # start while later files are still loading; the indices in `first`
+    # are read before the rest.
+    def __init__(self, paths, workers=None, first=()):
+        self.paths = paths
+        self._futures = [None] * len(paths)
+        pool = concurrent.futures.ThreadPoolExecutor(workers)
+        for i in list(first) + list(range(len(paths))):
+            if self._futures[i] is None:
+                self._futures[i] = pool.submit(read_text, paths[i])
+        # Queued reads still run; the pool just won't take new ones
+        pool.shutdown(wait=False)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def raw(self, i):
+        return self._futures[i].result()
+
+    def __getitem__(self, i):
+        return normalize_frame(self.raw(i))
+
+def load_frames_from_files(pattern, workers=None):
+    files = FrameFiles(list_frame_files(pattern), workers)
+    return [files.raw(i) for i in range(len(files))]
 
 def load_frames_from_single_file(path):
     with open(path, "r", encoding="utf-8") as f:
@@ -181,13 +743,1317 @@ def resample_y(lines, new_h):
         out.append(lines[idx])
     return out
 
-def main():
+def shrink_xy(lines, step_x, step_y):
+    out = []
+    for r in range(0, len(lines), step_y):
+        ln = lines[r]
+        out.append(ln[::step_x])
+    return out if out else [""]
+
+def pack_frames(frames_lines):
+    # All frames as one (n_frames, h, w) code-point array, padded with
+    # spaces, plus the true per-row lengths and per-frame heights.
+    n = len(frames_lines)
+    h = max(len(lines) for lines in frames_lines)
+    w = max(1, max((len(ln) for lines in frames_lines for ln in lines), default=0))
+    blank = " " * w
+    rows = []
+    for lines in frames_lines:
+        rows.extend(ln.ljust(w) for ln in lines)
+        rows.extend([blank] * (h - len(lines)))
+    text = "".join(rows)
+    if text.isascii():
+        codes = np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+    else:
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype="<u4")
+    lengths = np.zeros((n, h), dtype=np.int64)
+    for f, lines in enumerate(frames_lines):
+        lengths[f, :len(lines)] = [len(ln) for ln in lines]
+    heights = np.array([len(lines) for lines in frames_lines], dtype=np.int64)
+    return codes.reshape(n, h, w), lengths, heights
+
+def unpack_frames(codes, lengths, heights):
+    encoding = "ascii" if codes.dtype == np.uint8 else "utf-32-le"
+    w = codes.shape[2]
+    frames_lines = []
+    for f in range(codes.shape[0]):
+        h = int(heights[f])
+        text = np.ascontiguousarray(codes[f, :h]).tobytes().decode(encoding)
+        lens = lengths[f, :h].tolist()
+        frames_lines.append([text[r * w:r * w + lens[r]] for r in range(h)])
+    return frames_lines
+
+def stretch_x_frames(frames_lines, new_w, use_numpy=True):
+    if np is None or not use_numpy or new_w <= 0 or not frames_lines:
+        return [stretch_x(lines, new_w) for lines in frames_lines]
+    codes, lengths, heights = pack_frames(frames_lines)
+    out = np.full(codes.shape[:2] + (new_w,), ord(" "), dtype=codes.dtype)
+    cols = np.arange(new_w, dtype=np.int64)
+    for w in np.unique(lengths):
+        w = int(w)
+        if w == 0:
+            continue
+        # Same arithmetic as stretch_x: int(j * w / new_w) in float64
+        idx = np.minimum((cols * w / new_w).astype(np.int64), w - 1)
+        mask = lengths == w
+        out[mask] = codes[mask][:, idx]
+    return unpack_frames(out, np.full(lengths.shape, new_w, dtype=np.int64), heights)
+
+def resample_y_frames(frames_lines, new_h, use_numpy=True):
+    if np is None or not use_numpy or new_h <= 0 or not frames_lines:
+        return [resample_y(lines, new_h) for lines in frames_lines]
+    codes, lengths, heights = pack_frames(frames_lines)
+    out_h = int(min(new_h, codes.shape[1]))
+    out = np.empty((codes.shape[0], out_h, codes.shape[2]), dtype=codes.dtype)
+    out_lengths = np.zeros((codes.shape[0], out_h), dtype=np.int64)
+    rows = np.arange(out_h, dtype=np.int64)
+    for h in np.unique(heights):
+        h = int(h)
+        mask = heights == h
+        if new_h >= h:
+            out[mask] = codes[mask][:, :out_h]
+            out_lengths[mask] = lengths[mask][:, :out_h]
+            continue
+        idx = np.minimum((rows * h / new_h).astype(np.int64), h - 1)
+        out[mask] = codes[mask][:, idx]
+        out_lengths[mask] = lengths[mask][:, idx]
+    return unpack_frames(out, out_lengths, np.minimum(heights, new_h))
+
+def shrink_frames(frames_lines, step_x, step_y, use_numpy=True):
+    if np is None or not use_numpy or not frames_lines:
+        return [shrink_xy(lines, step_x, step_y) for lines in frames_lines]
+    codes, lengths, heights = pack_frames(frames_lines)
+    out = codes[:, ::step_y, ::step_x]
+    out_lengths = (lengths[:, ::step_y] + step_x - 1) // step_x
+    out_heights = (heights + step_y - 1) // step_y
+    return unpack_frames(out, out_lengths, out_heights)
+
+def glyph_levels(ramp):
+    # Density of each ramp glyph as its index in the ramp; blanks are empty
+    # and glyphs outside the ramp count as mid-density.
+    levels = {ch: i for i, ch in enumerate(ramp)}
+    levels.setdefault(" ", 0)
+    return levels, (len(ramp) - 1) // 2
+
+def area_shrink_xy(lines, step_x, step_y, ramp=DEFAULT_RAMP, width=None):
+    # Each output cell is the mean density of its step_x * step_y source
+    # block (the frame padded with blanks to `width`), rounded half up.
+    levels, unknown = glyph_levels(ramp)
+    if width is None:
+        width = max(len(ln) for ln in lines) if lines else 0
+    out = []
+    for r in range(0, len(lines), step_y):
+        block = [ln.ljust(width) for ln in lines[r:r + step_y]]
+        w = max(len(ln) for ln in lines[r:r + step_y])
+        row = []
+        for c in range(0, w, step_x):
+            total = 0
+            count = 0
+            for ln in block:
+                for ch in ln[c:c + step_x]:
+                    total += levels.get(ch, unknown)
+                    count += 1
+            row.append(ramp[(2 * total + count) // (2 * count)])
+        out.append("".join(row))
+    return out if out else [""]
+
+def area_shrink_frames(frames_lines, step_x, step_y, ramp=DEFAULT_RAMP, use_numpy=True):
+    if np is None or not use_numpy or not frames_lines:
+        width = max((len(ln) for lines in frames_lines for ln in lines), default=0)
+        return [area_shrink_xy(lines, step_x, step_y, ramp, width) for lines in frames_lines]
+    codes, lengths, heights = pack_frames(frames_lines)
+    n, h, w = codes.shape
+    levels, unknown = glyph_levels(ramp)
+    uniq, inv = np.unique(codes, return_inverse=True)
+    lut = np.array([levels.get(chr(c), unknown) for c in uniq.tolist()], dtype=np.int64)
+    values = lut[inv.reshape(-1)].reshape(n, h, w)
+    # Rows past a frame's height don't count towards its averages
+    valid = np.broadcast_to((np.arange(h)[None, :] < heights[:, None])[:, :, None], (n, h, w))
+    out_h = -(-h // step_y)
+    out_w = -(-w // step_x)
+    pad = ((0, 0), (0, out_h * step_y - h), (0, out_w * step_x - w))
+    values = np.pad(values * valid, pad)
+    weight = np.pad(valid.astype(np.int64), pad)
+    sums = values.reshape(n, out_h, step_y, out_w, step_x).sum(axis=(2, 4))
+    counts = np.maximum(weight.reshape(n, out_h, step_y, out_w, step_x).sum(axis=(2, 4)), 1)
+    idx = (2 * sums + counts) // (2 * counts)
+    ramp_codes = np.array([ord(ch) for ch in ramp], dtype=codes.dtype if ramp.isascii() else "<u4")
+    out = ramp_codes[idx]
+    if out.dtype != codes.dtype:
+        out = out.astype("<u4")
+    lengths = np.pad(lengths, ((0, 0), (0, out_h * step_y - h)))
+    out_lengths = (lengths.reshape(n, out_h, step_y).max(axis=2) + step_x - 1) // step_x
+    return unpack_frames(out, out_lengths, (heights + step_y - 1) // step_y)
+
+def plan_scaling(args, orig_w, orig_h, term_cols, term_rows):
+    # Returns (stretch_w, step_x, step_y): the width to stretch every line to
+    # (None for no stretch) and the downscale steps.
+    pad_x = max(0, args.pad_x)
+    pad_y = max(0, args.pad_y)
+    avail_cols = max(1, term_cols - pad_x)
+    avail_rows = max(1, term_rows - pad_y)
+
+    if args.fit is not None:
+        fit = max(0.05, min(1.0, args.fit))
+        target_w = max(1, int(math.floor(avail_cols * fit)))
+        target_h = max(1, int(math.floor(avail_rows * fit)))
+    elif args.target_width or args.target_height:
+        if args.target_width and args.target_height:
+            target_w, target_h = args.target_width, args.target_height
+        elif args.target_width:
+            target_w = args.target_width
+            target_h = max(1, int(round(orig_h * (target_w / max(1, orig_w)))))
+        else:
+            target_h = args.target_height
+            target_w = max(1, int(round(orig_w * (target_h / max(1, orig_h)))))
+    elif args.frame_width:
+        target_w = args.frame_width
+        target_h = max(1, int(round(orig_h * (target_w / max(1, orig_w)))))
+    else:
+        scale = max(0.02, min(1.0, args.scale if args.scale is not None else 1.0))
+        target_w = max(1, int(math.floor(orig_w * scale)))
+        target_h = max(1, int(math.floor(orig_h * scale)))
+        target_w = min(target_w, avail_cols)
+        target_h = min(target_h, avail_rows)
+
+    if args.square:
+        m = max(1, min(target_w or 1, target_h or 1))
+        target_w = m
+        target_h = m
+
+    stretch_w = None
+    if args.square_stretch:
+        stretch_w = max(1, min(orig_h, term_cols - pad_x))
+        target_w = orig_w
+        target_h = orig_h
+
+    step_x = max(1, int(math.floor(orig_w / max(1, target_w))))
+    step_y = max(1, int(math.floor(orig_h / max(1, target_h))))
+    return stretch_w, step_x, step_y
+
+def scale_frames(frames_lines, stretch_w, step_x, step_y, args):
+    use_numpy = not args.no_numpy
+    if stretch_w is not None:
+        frames_lines = stretch_x_frames(frames_lines, stretch_w, use_numpy=use_numpy)
+    if step_x > 1 or step_y > 1:
+        if args.downscale == "area":
+            frames_lines = area_shrink_frames(frames_lines, step_x, step_y, args.ramp, use_numpy=use_numpy)
+        else:
+            frames_lines = shrink_frames(frames_lines, step_x, step_y, use_numpy=use_numpy)
+    return frames_lines
+
+class LineTable:
+    # Frames as arrays of ids into one table of unique lines. Captures repeat
+    # the same lines across (and within) frames, so each is stored, scaled
+    # and padded once; indexing still gives a frame's list of lines.
+    def __init__(self, frames_lines=()):
+        self.lines = []
+        self.frames = []
+        self._ids = {}
+        for lines in frames_lines:
+            self.append(lines)
+
+    def intern(self, line):
+        i = self._ids.get(line)
+        if i is None:
+            i = self._ids[line] = len(self.lines)
+            self.lines.append(line)
+        return i
+
+    def append(self, lines):
+        self.frames.append(array("I", map(self.intern, lines)))
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, i):
+        lines = self.lines
+        return [lines[k] for k in self.frames[i]]
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self.frames)))
+
+    def line_count(self):
+        return sum(map(len, self.frames))
+
+    def dedup_ratio(self):
+        # Lines in all frames per unique line
+        return self.line_count() / max(1, len(self.lines))
+
+    def dims(self):
+        return max(map(len, self.lines), default=0), max(map(len, self.frames), default=0)
+
+    def _remap(self, frames, lines):
+        # Table of `frames` (lists of ids) into the new `lines`, which may
+        # now collide
+        out = LineTable()
+        remap = array("I", map(out.intern, lines))
+        out.frames = [array("I", [remap[k] for k in ids]) for ids in frames]
+        return out
+
+    def map_lines(self, fn):
+        # `fn` turns the list of unique lines into one new line each
+        return self._remap(self.frames, fn(self.lines) if self.lines else [])
+
+    def map_blocks(self, step, fn):
+        # Every frame's rows in blocks of `step`; `fn` turns the list of
+        # unique blocks (lists of lines) into one new line each
+        blocks = {}
+        frames = [
+            [blocks.setdefault(tuple(ids[r:r + step]), len(blocks)) for r in range(0, len(ids), step)]
+            for ids in self.frames
+        ]
+        lines = self.lines
+        unique = [[lines[k] for k in block] for block in blocks]
+        return self._remap(frames, fn(unique) if unique else [])
+
+    def rows(self, step):
+        # Every `step`th row of each frame, dropping lines no longer used
+        lines = self.lines
+        return LineTable([lines[k] for k in ids[::step]] for ids in self.frames)
+
+    def grids(self, region_w, region_h):
+        # frame_grid for every frame, padding each unique line once
+        padded = [ln[:region_w].ljust(region_w) for ln in self.lines]
+        blank = " " * region_w
+        grids = []
+        for ids in self.frames:
+            rows = [padded[k] for k in ids[:region_h]]
+            rows.extend([blank] * (region_h - len(rows)))
+            grids.append(rows)
+        return grids
+
+def scale_table(table, stretch_w, step_x, step_y, args):
+    # scale_frames for a LineTable: only unique lines (or row blocks, for
+    # area averaging) are resampled
+    use_numpy = not args.no_numpy
+    if stretch_w is not None:
+        table = table.map_lines(lambda lines: stretch_x_frames([lines], stretch_w, use_numpy=use_numpy)[0])
+    if step_x > 1 or step_y > 1:
+        if args.downscale == "area":
+            table = table.map_blocks(step_y, lambda blocks: [
+                lines[0] for lines in area_shrink_frames(blocks, step_x, step_y, args.ramp, use_numpy=use_numpy)
+            ])
+        else:
+            table = table.rows(step_y).map_lines(lambda lines: shrink_frames([lines], step_x, 1, use_numpy=use_numpy)[0])
+    return table
+
+def place_region(args, max_w, max_h, cols, rows):
+    pad_x = max(0, args.pad_x)
+    pad_y = max(0, args.pad_y)
+    region_w = args.frame_width if args.frame_width and args.frame_width > 0 else max_w
+    region_h = max_h
+
+    region_w = max(1, min(region_w, max(1, cols - pad_x)))
+    region_h = max(1, min(region_h, max(1, rows - pad_y)))
+
+    if args.corner == "top-left":
+        left = 1 + pad_x
+        top = 1 + pad_y
+    elif args.corner == "top-right":
+        left = max(1, cols - region_w - pad_x)
+        top = 1 + pad_y
+    elif args.corner == "bottom-left":
+        left = 1 + pad_x
+        top = max(1, rows - region_h - pad_y)
+    else:
+        left = max(1, cols - region_w - pad_x)
+        top = max(1, rows - region_h - pad_y)
+    return top, left, region_w, region_h
+
+def color_code(name, is_bg=False):
+    basic = {
+        "black": 30,
+        "red": 31,
+        "green": 32,
+        "yellow": 33,
+        "blue": 34,
+        "magenta": 35,
+        "cyan": 36,
+        "white": 37,
+    }
+    if isinstance(name, str) and name.isdigit():
+        code = int(name)
+        return code
+    base = basic.get(str(name).lower(), 32)
+    return base + 10 if is_bg else base
+
+def color_prefix_for(args):
+    fg = color_code(args.color, is_bg=False)
+    bg = color_code(args.bg, is_bg=True)
+    bold_prefix = f"{ESC}[1m" if args.bold else ""
+    return f"{bold_prefix}{ESC}[{fg}m{ESC}[{bg}m"
+
+# Cell colours parsed from frames are (fg, bg) pairs where each side is None
+# (the --color/--bg default), a palette index 0-255, or TRUECOLOR | 0xRRGGBB
+TRUECOLOR = 1 << 24
+ANSI_SEQ = re.compile(r"\x1b\[([0-9;?]*)([A-Za-z])")
+
+# xterm's default 16-colour palette
+PALETTE16 = [
+    (0, 0, 0), (205, 0, 0), (0, 205, 0), (205, 205, 0),
+    (0, 0, 238), (205, 0, 205), (0, 205, 205), (229, 229, 229),
+    (127, 127, 127), (255, 0, 0), (0, 255, 0), (255, 255, 0),
+    (92, 92, 255), (255, 0, 255), (0, 255, 255), (255, 255, 255),
+]
+CUBE_LEVELS = (0, 95, 135, 175, 215, 255)
+
+def palette_rgb(index):
+    if index < 16:
+        return PALETTE16[index]
+    if index < 232:
+        index -= 16
+        return CUBE_LEVELS[index // 36], CUBE_LEVELS[index // 6 % 6], CUBE_LEVELS[index % 6]
+    level = 8 + 10 * (index - 232)
+    return level, level, level
+
+# Nearest cube level for every channel value
+CUBE_INDEX = [min(range(6), key=lambda k: abs(CUBE_LEVELS[k] - v)) for v in range(256)]
+
+def rgb_distance(a, b):
+    return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2
+
+def nearest_16(rgb):
+    return min(range(16), key=lambda i: rgb_distance(rgb, PALETTE16[i]))
+
+def nearest_256(rgb):
+    # Best of the closest colour-cube entry and the closest grey
+    r, g, b = CUBE_INDEX[rgb[0]], CUBE_INDEX[rgb[1]], CUBE_INDEX[rgb[2]]
+    cube = 16 + 36 * r + 6 * g + b
+    level = min(23, max(0, int(round((sum(rgb) / 3.0 - 8) / 10))))
+    grey = 8 + 10 * level
+    if rgb_distance(rgb, (grey, grey, grey)) < rgb_distance(rgb, (CUBE_LEVELS[r], CUBE_LEVELS[g], CUBE_LEVELS[b])):
+        return 232 + level
+    return cube
+
+def detect_color_depth():
+    colorterm = os.environ.get("COLORTERM", "").lower()
+    if colorterm in ("truecolor", "24bit") or os.environ.get("WT_SESSION"):
+        return "truecolor"
+    if "256" in os.environ.get("TERM", ""):
+        return "256"
+    return "16"
+
+def color_param(color, depth, is_bg=False):
+    # Shortest SGR parameter for a parsed colour at the given depth
+    if color >= TRUECOLOR:
+        rgb = ((color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF)
+        if depth == "truecolor":
+            return f"{48 if is_bg else 38};2;{rgb[0]};{rgb[1]};{rgb[2]}"
+        color = nearest_256(rgb) if depth == "256" else nearest_16(rgb)
+    elif color >= 16 and depth == "16":
+        color = nearest_16(palette_rgb(color))
+    if color < 8:
+        return str((40 if is_bg else 30) + color)
+    if color < 16:
+        return str((100 if is_bg else 90) + color - 8)
+    return f"{48 if is_bg else 38};5;{color}"
+
+def apply_sgr(params, fg, bg):
+    # Colours after one SGR sequence; attributes other than colour are ignored
+    codes = [int(p) if p else 0 for p in params.split(";")] if params else [0]
+    i = 0
+    while i < len(codes):
+        code = codes[i]
+        if code == 0:
+            fg = bg = None
+        elif 30 <= code <= 37:
+            fg = code - 30
+        elif 90 <= code <= 97:
+            fg = code - 90 + 8
+        elif 40 <= code <= 47:
+            bg = code - 40
+        elif 100 <= code <= 107:
+            bg = code - 100 + 8
+        elif code == 39:
+            fg = None
+        elif code == 49:
+            bg = None
+        elif code in (38, 48) and i + 1 < len(codes):
+            if codes[i + 1] == 5 and i + 2 < len(codes):
+                color = codes[i + 2] & 0xFF
+                i += 2
+            elif codes[i + 1] == 2 and i + 4 < len(codes):
+                r, g, b = (c & 0xFF for c in codes[i + 2:i + 5])
+                color = TRUECOLOR | (r << 16) | (g << 8) | b
+                i += 4
+            else:
+                break
+            if code == 38:
+                fg = color
+            else:
+                bg = color
+        i += 1
+    return fg, bg
+
+def parse_ansi_frame(frame, cache):
+    # (lines, colors) of a frame containing ANSI escapes: the plain text and
+    # a (fg, bg) per character. Colour state carries over line breaks.
+    # `cache` maps (SGR parameters, colours before) to the colours after
+    # and can be shared between frames.
+    lines = []
+    colors = []
+    attr = (None, None)
+    for raw in frame.splitlines() or [""]:
+        chars = []
+        row = []
+        pos = 0
+        for m in ANSI_SEQ.finditer(raw):
+            text = raw[pos:m.start()]
+            chars.append(text)
+            row.extend([attr] * len(text))
+            if m.group(2) == "m":
+                key = (m.group(1), attr)
+                after = cache.get(key)
+                if after is None:
+                    after = cache[key] = apply_sgr(m.group(1), *attr)
+                attr = after
+            pos = m.end()
+        chars.append(raw[pos:])
+        row.extend([attr] * (len(raw) - pos))
+        lines.append("".join(chars))
+        colors.append(row)
+    return lines, colors
+
+def split_colors(frames):
+    # (frames_lines, colors): normalized frames, plus per-cell colours when
+    # any frame carries ANSI colour escapes (None otherwise)
+    if not any(ESC in f for f in frames):
+        return [normalize_frame(f) for f in frames], None
+    cache = {}
+    parsed = [parse_ansi_frame(f, cache) for f in frames]
+    return [lines for lines, _ in parsed], [colors for _, colors in parsed]
+
+def load_color_plane(pattern, frames_lines):
+    # Colours from a sidecar file (or glob) laid out like the frames and
+    # coloured with ANSI escapes; only its colours are used. The plane
+    # repeats if it has fewer frames than the animation.
+    if os.path.isfile(pattern):
+        frames = load_frames_from_single_file(pattern)
+    else:
+        frames = load_frames_from_files(pattern)
+    _, plane = split_colors(frames)
+    if not plane:
+        return None
+    none = (None, None)
+    colors = []
+    for i, lines in enumerate(frames_lines):
+        frame = plane[i % len(plane)]
+        rows = []
+        for r, ln in enumerate(lines):
+            row = frame[r][:len(ln)] if r < len(frame) else []
+            rows.append(row + [none] * (len(ln) - len(row)))
+        colors.append(rows)
+    return colors
+
+def stretch_cells(row, new_w):
+    # stretch_x for one row of colours
+    w = len(row)
+    if w == 0:
+        return [(None, None)] * new_w
+    return [row[min(w - 1, int(j * w / new_w))] for j in range(new_w)]
+
+def scale_colors(colors, stretch_w, step_x, step_y):
+    # Apply the frames' geometry to their colour planes. Downscaling samples
+    # the colour at the top-left of each block, whichever --downscale is
+    # used for the glyphs.
+    out = []
+    for rows in colors:
+        if stretch_w is not None:
+            rows = [stretch_cells(row, stretch_w) for row in rows]
+        if step_x > 1 or step_y > 1:
+            rows = [row[::step_x] for row in rows[::step_y]]
+        out.append(rows)
+    return out
+
+def color_grid(rows, region_w, region_h, params):
+    # frame_grid for a colour plane, with the colours turned into SGR
+    # parameters by `params`
+    out = []
+    for row in rows[:region_h]:
+        row = [params(attr) for attr in row[:region_w]]
+        out.append(row + [params((None, None))] * (region_w - len(row)))
+    while len(out) < region_h:
+        out.append([params((None, None))] * region_w)
+    return out
+
+def parse_term_size(text):
+    cols, _, rows = text.lower().partition("x")
+    try:
+        return max(1, int(cols)), max(1, int(rows))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected COLSxROWS, got {text!r}")
+
+def source_fps(args, pack=None):
+    # --fps, else the frame pack's rate, else 20
+    if args.fps:
+        return args.fps
+    if pack is None and os.path.isfile(args.source) and framepack.is_pack(args.source):
+        pack = framepack.FramePack(args.source)
+    return (pack.fps if pack is not None else 0.0) or 20.0
+
+def load_animation(args):
+    # (frames_lines, colors, fps, lazy): normalized frames, as a list or,
+    # with --lazy, as a sequence that decodes them on access, and their
+    # per-cell colours if they have any. Coloured sources are never lazy.
+    lazy = args.lazy and not args.colors
+    is_file = os.path.isfile(args.source)
+    pack = None
+    if is_file and framepack.is_pack(args.source):
+        pack = framepack.FramePack(args.source)
+    fps = source_fps(args, pack)
+    if lazy and pack is not None:
+        if len(pack) == 0 or ESC not in pack[0]:
+            return LazyFrames(pack, normalize_frame), None, fps, True
+    elif lazy and is_file:
+        source = MmapFrameSource(args.source)
+        if source._map.find(b"\x1b[") == -1:
+            return source, None, fps, True
+        source.close()
+    if pack is not None:
+        frames = [pack[i] for i in range(len(pack))]
+    elif is_file:
+        frames = load_frames_from_single_file(args.source)
+    else:
+        # Read the frames the region is sized from (frame 0 among them)
+        # first, so a lazy start only waits for those
+        paths = list_frame_files(args.source)
+        files = FrameFiles(paths, args.load_threads, sample_indices(len(paths)))
+        if lazy and len(files) and ESC not in files.raw(0):
+            return files, None, fps, True
+        frames = [files.raw(i) for i in range(len(files))]
+    frames_lines, colors = split_colors(frames)
+    if args.colors:
+        colors = load_color_plane(args.colors, frames_lines)
+    return LineTable(frames_lines), colors, fps, False
+
+def prepare_animation(args, frames_lines, term_cols, term_rows, lazy=False, colors=None):
+    # Scale and place the frames (and their colours) for this terminal and
+    # compile them
+    if lazy:
+        orig_w, orig_h = compute_max_dims(sample_frames(frames_lines))
+    else:
+        if not isinstance(frames_lines, LineTable):
+            frames_lines = LineTable(frames_lines)
+        orig_w, orig_h = frames_lines.dims()
+    stretch_w, step_x, step_y = plan_scaling(args, orig_w, orig_h, term_cols, term_rows)
+    if lazy:
+        source = frames_lines
+        frames_lines = LazyFrames(source, lambda lines: scale_frames([lines], stretch_w, step_x, step_y, args)[0])
+        max_w, max_h = compute_max_dims(sample_frames(frames_lines))
+    else:
+        frames_lines = scale_table(frames_lines, stretch_w, step_x, step_y, args)
+        max_w, max_h = frames_lines.dims()
+    top, left, region_w, region_h = place_region(args, max_w, max_h, term_cols, term_rows)
+    color_prefix = color_prefix_for(args)
+    reset = f"{ESC}[0m"
+    if lazy:
+        grids = LazyFrames(frames_lines, lambda lines: frame_grid(lines, region_w, region_h))
+        return CompiledAnimation(grids, top, left, color_prefix, reset, args.redraw, precompile=False)
+    grids = frames_lines.grids(region_w, region_h)
+    if colors is None:
+        holds = None
+        if args.dedup is not None:
+            # A source that is several copies of one loop keeps one copy
+            del grids[cycle_length([tuple(grid) for grid in grids]):]
+            keep, holds = dedup_frames(grids, threshold=args.dedup)
+            grids = [grids[i] for i in keep]
+        return CompiledAnimation(grids, top, left, color_prefix, reset, args.redraw, holds=holds)
+    depth = detect_color_depth() if args.color_depth == "auto" else args.color_depth
+    default_attr = (str(color_code(args.color)), str(color_code(args.bg, is_bg=True)))
+    interned = {}
+
+    def params(attr):
+        key = interned.get(attr)
+        if key is None:
+            fg, bg = attr
+            key = interned[attr] = (
+                default_attr[0] if fg is None else color_param(fg, depth),
+                default_attr[1] if bg is None else color_param(bg, depth, is_bg=True),
+            )
+        return key
+
+    colors = scale_colors(colors, stretch_w, step_x, step_y)
+    planes = [color_grid(rows, region_w, region_h, params) for rows in colors]
+    holds = None
+    if args.dedup is not None:
+        n = cycle_length([(tuple(grid), tuple(map(tuple, plane))) for grid, plane in zip(grids, planes)])
+        del grids[n:], planes[n:]
+        keep, holds = dedup_frames(grids, planes, args.dedup)
+        grids = [grids[i] for i in keep]
+        planes = [planes[i] for i in keep]
+    return CompiledAnimation(grids, top, left, color_prefix, reset, args.redraw, colors=planes, default_attr=default_attr, holds=holds)
+
+# Options that change how frames are scaled, placed or encoded; part of the
+# LayoutCache key along with the terminal size
+LAYOUT_ARGS = (
+    "corner", "pad_x", "pad_y", "frame_width", "target_width", "target_height",
+    "fit", "scale", "square", "square_stretch", "downscale", "ramp", "no_numpy",
+    "redraw", "color", "bg", "bold", "color_depth", "dedup",
+)
+
+class LayoutCache:
+    # Compiled animations for the terminal sizes seen so far, most recently
+    # used last, so going back to a previous window size is instant. New
+    # sizes are prepared on a worker thread while playback continues.
+    def __init__(self, args, frames_lines, lazy=False, size=4, colors=None, disk=None):
+        # With `disk` (a FrameCache), frames_lines may be None: the source
+        # is then only loaded if some size isn't cached on disk either
+        self.args = args
+        self.frames_lines = frames_lines
+        self.colors = colors
+        self.lazy = lazy
+        self.disk = disk
+        self._content = None
+        self.size = size
+        self._entries = collections.OrderedDict()
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._pending = None
+
+    def key(self, cols, rows):
+        return (cols, rows) + tuple(getattr(self.args, name) for name in LAYOUT_ARGS)
+
+    def _store(self, key, anim):
+        self._entries[key] = anim
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def _prepare(self, cols, rows):
+        if self.disk is not None:
+            anim = self.disk.load(cols, rows)
+            if anim is not None:
+                return anim
+        if self.frames_lines is None:
+            self.frames_lines, self.colors, _, self.lazy = load_animation(self.args)
+        content = None
+        if self.disk is not None and not self.lazy:
+            # Files touched but unchanged still hit, by what was loaded
+            if self._content is None:
+                self._content = self.disk.content_digest(self.frames_lines, self.colors)
+            content = self._content
+            anim = self.disk.load(cols, rows, content)
+            if anim is not None:
+                self.disk.store(cols, rows, anim, content)
+                return anim
+        anim = prepare_animation(self.args, self.frames_lines, cols, rows, self.lazy, self.colors)
+        if content is not None:
+            self.disk.store(cols, rows, anim, content)
+        return anim
+
+    def get(self, cols, rows):
+        # Compiled animation for this size, built now if not cached
+        key = self.key(cols, rows)
+        anim = self._entries.get(key)
+        if anim is None:
+            anim = self._prepare(cols, rows)
+        self._store(key, anim)
+        return anim
+
+    def request(self, cols, rows):
+        # The cached animation for this size, or None after starting a
+        # background build that poll() will hand over once it finishes.
+        # A newer request supersedes one still in flight.
+        key = self.key(cols, rows)
+        anim = self._entries.get(key)
+        if anim is not None:
+            self._entries.move_to_end(key)
+            self._pending = None
+            return anim
+        if self._pending is None or self._pending[0] != key:
+            self._pending = (key, self._pool.submit(self._prepare, cols, rows))
+        return None
+
+    def poll(self):
+        if self._pending is None or not self._pending[1].done():
+            return None
+        key, future = self._pending
+        self._pending = None
+        anim = future.result()
+        self._store(key, anim)
+        return anim
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+
+def cache_dir(*parts):
+    # ascii-live's cache directory (under $XDG_CACHE_HOME, %LOCALAPPDATA% or
+    # ~/.cache), joined with `parts`; shared with goframes.py
+    base = os.environ.get("XDG_CACHE_HOME") or os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ascii-live", *parts)
+
+class FrameCache:
+    # Compiled animations kept on disk between runs, one entry per source,
+    # layout options and terminal size. An entry is valid while the source
+    # files keep their names, mtimes and sizes; otherwise the hash of the
+    # loaded frames decides, so a touched but unchanged source still hits.
+    # Hits refresh an entry's mtime and the least recently used entries are
+    # removed once the directory grows past `max_bytes`.
+    VERSION = 3
+
+    def __init__(self, args, directory=None, max_bytes=256 << 20):
+        self.args = args
+        self.directory = directory or cache_dir("frames")
+        self.max_bytes = max_bytes
+        self.stamp = self.source_stamp()
+
+    def source_stamp(self):
+        # Names, mtimes and sizes of the source (and --colors) files; stat
+        # only, nothing is read
+        stamp = []
+        for pattern in (self.args.source, self.args.colors):
+            if not pattern:
+                continue
+            files = [pattern] if os.path.isfile(pattern) else list_frame_files(pattern)
+            for path in files:
+                st = os.stat(path)
+                stamp.append((os.path.basename(path), st.st_mtime_ns, st.st_size))
+            stamp.append(None)
+        return stamp
+
+    def content_digest(self, frames_lines, colors=None):
+        # Hash of the frames as loaded (a LineTable) and their colours
+        h = hashlib.sha1(pickle.dumps(frames_lines.lines, pickle.HIGHEST_PROTOCOL))
+        for ids in frames_lines.frames:
+            h.update(b"%d\0" % len(ids))
+            h.update(ids.tobytes())
+        if colors is not None:
+            h.update(pickle.dumps(colors, pickle.HIGHEST_PROTOCOL))
+        return h.hexdigest()
+
+    def path(self, cols, rows):
+        args = self.args
+        options = [self.VERSION, os.path.abspath(args.source), args.colors and os.path.abspath(args.colors), cols, rows]
+        options += [getattr(args, name) for name in LAYOUT_ARGS]
+        if args.color_depth == "auto":
+            options.append(detect_color_depth())
+        key = hashlib.sha1(json.dumps(options).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key + ".pickle")
+
+    def load(self, cols, rows, content=None):
+        # The cached animation if the source files are unchanged, or, given
+        # `content`, if the frames hash the same
+        path = self.path(cols, rows)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+            if entry["stamp"] != self.stamp and (content is None or entry["sha1"] != content):
+                return None
+            os.utime(path)
+        except (OSError, pickle.PickleError, EOFError, AttributeError, ValueError, KeyError, TypeError):
+            return None
+        return entry["anim"]
+
+    def store(self, cols, rows, anim, content):
+        path = self.path(cols, rows)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump({"stamp": self.stamp, "sha1": content, "anim": anim}, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+            self.evict()
+        except OSError:
+            pass
+
+    def evict(self):
+        entries = []
+        with os.scandir(self.directory) as it:
+            for e in it:
+                if e.name.endswith(".pickle"):
+                    st = e.stat()
+                    entries.append((st.st_mtime_ns, st.st_size, e.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+class ResizeWatcher:
+    # Notices terminal resizes: SIGWINCH where there is one, otherwise a
+    # size check every `interval` seconds.
+    def __init__(self, size, interval=0.5):
+        self.size = size
+        self.interval = interval
+        self._flag = threading.Event()
+        self._next_check = None
+        if hasattr(signal, "SIGWINCH"):
+            signal.signal(signal.SIGWINCH, lambda signum, frame: self._flag.set())
+        else:
+            self._next_check = time.perf_counter() + interval
+
+    def changed(self):
+        # The new (cols, rows) if the size changed since the last call
+        if self._next_check is not None:
+            now = time.perf_counter()
+            if now < self._next_check:
+                return None
+            self._next_check = now + self.interval
+        elif not self._flag.is_set():
+            return None
+        self._flag.clear()
+        size = get_terminal_size()
+        if size == self.size:
+            return None
+        self.size = size
+        return size
+
+    def close(self):
+        if self._next_check is None:
+            signal.signal(signal.SIGWINCH, signal.SIG_DFL)
+
+def switch_layout(old, new, shown, cols, rows):
+    # Bytes that blank the old region (as far as it is still on screen) and
+    # paint frame `shown` in the new one
+    parts = [old.reset]
+    width = min(old.region_w, cols - old.left + 1)
+    for r in range(min(old.region_h, rows - old.top + 1)):
+        if width > 0:
+            parts.append(cursor_to(old.top + r, old.left) + " " * width)
+    return "".join(parts).encode("utf-8") + new.render(None, shown)
+
+class Canvas:
+    # Screen buffer for the compositor: a character and an attribute (the
+    # SGR prefix of the layer that drew it) per cell. put() records changes
+    # and flush() encodes every changed span as one payload.
+    def __init__(self, cols, rows, reset):
+        self.chars = [[" "] * cols for _ in range(rows)]
+        self.attrs = [[""] * cols for _ in range(rows)]
+        self.reset = reset
+        self.dirty = collections.defaultdict(list)
+
+    def put(self, row, col, text, attr):
+        # 0-based cell coordinates
+        end = col + len(text)
+        self.chars[row][col:end] = text
+        self.attrs[row][col:end] = [attr] * len(text)
+        self.dirty[row].append((col, end))
+
+    def flush(self):
+        parts = []
+        current = None
+        for row in sorted(self.dirty):
+            chars = self.chars[row]
+            attrs = self.attrs[row]
+            spans = sorted(self.dirty[row])
+            merged = [list(spans[0])]
+            for start, end in spans[1:]:
+                if start <= merged[-1][1]:
+                    merged[-1][1] = max(merged[-1][1], end)
+                else:
+                    merged.append([start, end])
+            for start, end in merged:
+                parts.append(cursor_to(row + 1, start + 1))
+                col = start
+                while col < end:
+                    attr = attrs[col]
+                    run = col + 1
+                    while run < end and attrs[run] == attr:
+                        run += 1
+                    if attr != current:
+                        parts.append(self.reset + attr)
+                        current = attr
+                    parts.append("".join(chars[col:run]))
+                    col = run
+        self.dirty.clear()
+        return "".join(parts).encode("utf-8")
+
+class Layer:
+    # One animation in the compositor, with its own clock. `segments` are
+    # the parts of its region not covered by a later layer, as
+    # (region row, first column, last column + 1).
+    def __init__(self, anim, sched):
+        self.anim = anim
+        self.sched = sched
+        self.shown = 0
+        self.tick = 0
+        self.segments = [(r, 0, anim.region_w) for r in range(anim.region_h)]
+
+    def rect(self):
+        return self.anim.top, self.anim.left, self.anim.region_h, self.anim.region_w
+
+    def occlude(self, above):
+        # Drop the cells hidden under the layers in `above`
+        top, left, height, width = self.rect()
+        segments = []
+        for r, start, end in self.segments:
+            covered = [False] * width
+            for other_top, other_left, other_h, other_w in above:
+                if other_top <= top + r < other_top + other_h:
+                    for c in range(max(0, other_left - left), min(width, other_left + other_w - left)):
+                        covered[c] = True
+            c = start
+            while c < end:
+                if covered[c]:
+                    c += 1
+                    continue
+                run = c
+                while run < end and not covered[run]:
+                    run += 1
+                segments.append((r, c, run))
+                c = run
+        self.segments = segments
+
+    def paint(self, canvas, shown, target):
+        # Put the cells that differ between frames `shown` and `target`
+        # (all of them when shown is None) on the canvas
+        anim = self.anim
+        grid = anim.grids[target]
+        prev = None if shown is None else anim.grids[shown]
+        if anim.colors is not None:
+            self.paint_colors(canvas, shown, target)
+            return
+        for r, start, end in self.segments:
+            new = grid[r][start:end]
+            row = anim.top - 1 + r
+            col = anim.left - 1 + start
+            if prev is None:
+                canvas.put(row, col, new, anim.color_prefix)
+                continue
+            old = prev[r][start:end]
+            if old == new:
+                continue
+            for s, e in changed_runs(old, new, 0):
+                canvas.put(row, col + s, new[s:e], anim.color_prefix)
+
+    def paint_colors(self, canvas, shown, target):
+        anim = self.anim
+        grid = anim.grids[target]
+        colors = anim.colors[target]
+        for r, start, end in self.segments:
+            new = list(zip(grid[r][start:end], colors[r][start:end]))
+            if shown is None:
+                runs = [(0, len(new))]
+            else:
+                runs = changed_runs(list(zip(anim.grids[shown][r][start:end], anim.colors[shown][r][start:end])), new, 0)
+            for s, e in runs:
+                # One put per stretch of a single colour
+                while s < e:
+                    attr = new[s][1]
+                    run = s + 1
+                    while run < e and new[run][1] == attr:
+                        run += 1
+                    text = "".join(ch for ch, _ in new[s:run])
+                    canvas.put(anim.top - 1 + r, anim.left - 1 + start + s, text, anim.cell_prefix(attr))
+                    s = run
+
+def parse_layer(parser, args, spec):
+    # "source=a.txt,corner=top-right,fps=10,bold" -> a copy of `args` with
+    # those options overridden, parsed the same way as the command line
+    argv = []
+    for item in spec.split(","):
+        key, sep, value = item.partition("=")
+        argv.append("--" + key.strip().replace("_", "-"))
+        if sep:
+            argv.append(value)
+    return parser.parse_args(argv, namespace=argparse.Namespace(**vars(args)))
+
+def composite(args, parser):
+    # Play every --layer in this process: each layer keeps its own rate,
+    # but they share one sleep and one canvas, and each tick is a single
+    # write. Later layers are drawn on top of earlier ones.
+    cols, rows = args.term_size or get_terminal_size()
+    layers = []
+    for spec in args.layer:
+        layer_args = parse_layer(parser, args, spec)
+        frames_lines, colors, fps, lazy = load_animation(layer_args)
+        anim = prepare_animation(layer_args, frames_lines, cols, rows, lazy, colors)
+        layers.append(Layer(anim, FrameScheduler(fps, layer_args.lag)))
+    for i, layer in enumerate(layers):
+        layer.occlude([other.rect() for other in layers[i + 1:]])
+    canvas = Canvas(cols, rows, layers[0].anim.reset)
+    out = sys.stdout.buffer
+    ticks = 0
+    bytes_written = 0
+
+    try:
+        hide_cursor()
+        sys.stdout.flush()
+        for layer in layers:
+            layer.paint(canvas, None, 0)
+        blob = canvas.flush()
+        out.write(blob)
+        out.flush()
+        bytes_written += len(blob)
+        now = time.perf_counter()
+        for layer in layers:
+            layer.sched.start(now)
+        while True:
+            deadline = min(layer.sched.deadline for layer in layers)
+            now = time.perf_counter()
+            if now < deadline:
+                time.sleep(deadline - now)
+                now = time.perf_counter()
+            for layer in layers:
+                if now >= layer.sched.deadline:
+                    steps = layer.sched.advance(now)
+                    layer.tick = (layer.tick + steps) % layer.anim.ticks
+                    target = layer.anim.frame_at(layer.tick)
+                    if target != layer.shown:
+                        layer.paint(canvas, layer.shown, target)
+                        layer.shown = target
+            blob = canvas.flush()
+            if blob:
+                out.write(blob)
+                out.flush()
+                bytes_written += len(blob)
+            ticks += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sys.stdout.write(canvas.reset)
+        show_cursor()
+        sys.stdout.flush()
+
+    if args.stats:
+        print(f"ticks: {ticks}, bytes written: {bytes_written}", file=sys.stderr)
+        for spec, layer in zip(args.layer, layers):
+            st = layer.sched.summary()
+            print(f"{spec}: {st['frames']} frames, {st['dropped']} dropped, {st['fps']:.2f}/{st['target_fps']:.2f} fps, jitter {st['jitter_ms']:.2f} ms", file=sys.stderr)
+
+class InlineWriter:
+    # Writes frames from the playback loop itself. Frames are handed over
+    # as (anim, base, target, blob): `blob` takes the screen from frame
+    # `base` to `target` of `anim`. If the screen isn't at `base`, or shows
+    # another layout, the bytes are worked out again from what is there.
+    def __init__(self, out, anim, shown=0, prof=None):
+        self.out = out
+        self.anim = anim
+        self.shown = shown
+        self.prof = prof
+        self.bytes = 0
+        self.dropped = 0
+
+    def resolve(self, anim, base, target, blob, size):
+        if anim is not self.anim:
+            blob = switch_layout(self.anim, anim, target, *size)
+            self.anim = anim
+        elif base != self.shown or blob is None:
+            blob = anim.step(self.shown, target)
+        self.shown = target
+        return blob
+
+    def write(self, blob):
+        if self.prof is None:
+            self.out.write(blob)
+            self.out.flush()
+        else:
+            t0 = time.perf_counter_ns()
+            self.out.write(blob)
+            t1 = time.perf_counter_ns()
+            self.out.flush()
+            self.prof.record("write", t1 - t0)
+            self.prof.record("flush", time.perf_counter_ns() - t1)
+            # Counted as written: frames dropped for backpressure don't
+            # count, and re-rendered ones count at their actual size
+            self.prof.frame(len(blob))
+        self.bytes += len(blob)
+
+    def submit(self, anim, base, target, blob, size, switch=False):
+        self.write(self.resolve(anim, base, target, blob, size))
+
+    def close(self):
+        pass
+
+class ThreadedWriter(InlineWriter):
+    # Writes on its own thread, so a terminal or pipe that blocks doesn't
+    # stall the frame clock. Besides the frame being written, one more
+    # waits; a newer frame replaces it and the stale one counts as a
+    # backpressure drop, unless the newer one is a layout switch repainting
+    # the current frame.
+    def __init__(self, out, anim, shown=0, prof=None):
+        super().__init__(out, anim, shown, prof)
+        self._cond = threading.Condition()
+        self._pending = None
+        self._closed = False
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="frame-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, anim, base, target, blob, size, switch=False):
+        if self._error is not None:
+            # The output is gone (e.g. a closed pipe); stop like an inline
+            # write would have
+            raise self._error
+        with self._cond:
+            if self._pending is not None and not switch:
+                self.dropped += 1
+            self._pending = (anim, base, target, blob, size)
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                item = self._pending
+                self._pending = None
+            try:
+                self.write(self.resolve(*item))
+            except OSError as e:
+                self._error = e
+                return
+
+    def close(self, timeout=1.0):
+        # Finish the frame in hand and any waiting one; give up after
+        # `timeout` if the output is stuck
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+class TeeOutput(io.RawIOBase):
+    # Binary stream that records everything written through it
+    def __init__(self, out, recorder):
+        super().__init__()
+        self.out = out
+        self.recorder = recorder
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self.recorder.output(data)
+        self.out.write(data)
+        return len(data)
+
+    def flush(self):
+        self.out.flush()
+
+class CastRecorder:
+    # Records output as an asciicast v2 file: a JSON header line, then one
+    # [seconds, "o", text] line per write ("r" for a resize). Lines go
+    # through a large file buffer, so a frame costs one json.dumps.
+    def __init__(self, path, cols, rows, buffer_size=1 << 16):
+        self._f = open(path, "w", encoding="utf-8", newline="\n", buffering=buffer_size)
+        self._lock = threading.Lock()
+        self._stdout = None
+        self.events = 0
+        header = {
+            "version": 2,
+            "width": cols,
+            "height": rows,
+            "timestamp": int(time.time()),
+            "env": {"TERM": os.environ.get("TERM", "")},
+        }
+        self._f.write(json.dumps(header) + "\n")
+        self._start = time.perf_counter()
+
+    def event(self, code, data):
+        t = time.perf_counter() - self._start
+        with self._lock:
+            self._f.write(json.dumps([round(t, 6), code, data]) + "\n")
+            self.events += 1
+
+    def output(self, data):
+        self.event("o", data.decode("utf-8", "replace"))
+
+    def resize(self, cols, rows):
+        self.event("r", f"{cols}x{rows}")
+
+    def tee(self, out):
+        return TeeOutput(out, self)
+
+    def capture_stdout(self):
+        # Route sys.stdout (text and .buffer) through the recorder until close()
+        self._stdout = sys.stdout
+        sys.stdout = io.TextIOWrapper(self.tee(sys.stdout.buffer), encoding="utf-8", errors="replace")
+
+    def close(self):
+        if self._stdout is not None:
+            sys.stdout.flush()
+            sys.stdout = self._stdout
+            self._stdout = None
+        with self._lock:
+            self._f.close()
+
+def replay_cast(path, out, speed=1.0):
+    # Write the output events of an asciicast v2 recording to `out` at
+    # `speed` times the recorded pace (0: as fast as possible)
+    events = 0
+    bytes_written = 0
+    duration = 0.0
+    with open(path, "r", encoding="utf-8") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("version") != 2:
+            raise ValueError(f"{path}: not an asciicast v2 recording")
+        start = time.perf_counter()
+        for line in f:
+            if not line.strip():
+                continue
+            t, code, data = json.loads(line)
+            duration = t
+            if code != "o":
+                continue
+            if speed > 0:
+                delay = start + t / speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            blob = data.encode("utf-8")
+            out.write(blob)
+            if speed > 0:
+                out.flush()
+            events += 1
+            bytes_written += len(blob)
+        elapsed = time.perf_counter() - start
+    return {
+        "events": events,
+        "bytes": bytes_written,
+        "recorded_s": duration,
+        "replay_s": elapsed,
+        "speedup": duration / elapsed if elapsed > 0 else None,
+        "mb_per_s": bytes_written / elapsed / 1e6 if elapsed > 0 else None,
+    }
+
+def run_headless(anim, sink, frames=None, prof=None):
+    # Play `frames` ticks back to back into `sink` (any object with
+    # write(bytes)) and time it; held frames cost nothing
+    frames = anim.ticks if frames is None else max(1, frames)
+    start = time.perf_counter_ns()
+    sink.write(anim.intro)
+    bytes_written = len(anim.intro)
+    shown = 0
+    for tick in range(1, frames):
+        target = anim.frame_at(tick % anim.ticks)
+        if target == shown:
+            continue
+        if prof is None:
+            blob = anim.step(shown, target)
+            sink.write(blob)
+        else:
+            t0 = time.perf_counter_ns()
+            blob = anim.step(shown, target)
+            t1 = time.perf_counter_ns()
+            sink.write(blob)
+            prof.record("render", t1 - t0)
+            prof.record("write", time.perf_counter_ns() - t1)
+            prof.frame(len(blob))
+        bytes_written += len(blob)
+        shown = target
+    elapsed = time.perf_counter_ns() - start
+    return {
+        "frames": frames,
+        "unique_frames": len(anim),
+        "render_s": elapsed / 1e9,
+        "us_per_frame": elapsed / 1e3 / frames,
+        "bytes": bytes_written,
+        "bytes_per_frame": bytes_written / frames,
+    }
+
+def build_parser():
     parser = argparse.ArgumentParser(description="Play ASCII animation in a screen corner")
     parser.add_argument("--source", default=r"C:\\Users\\mohit\\ascii-live\\animations\\my-animation\\*.txt*", help="Glob for multiple frame files or a single file path with frames separated by blank lines")
     parser.add_argument("--corner", choices=["top-left", "top-right", "bottom-left", "bottom-right"], default="top-left", help="Screen corner to render the animation")
     parser.add_argument("--pad-x", type=int, default=2, help="Horizontal padding from the edge")
     parser.add_argument("--pad-y", type=int, default=1, help="Vertical padding from the edge")
-    parser.add_argument("--fps", type=float, default=20.0, help="Frames per second")
+    parser.add_argument("--fps", type=float, default=None, help="Frames per second (default: the frame pack's rate, else 20)")
     parser.add_argument("--frame-width", type=int, default=None, help="Explicit frame width override")
     parser.add_argument("--target-width", type=int, default=None, help="Target width after downscaling")
     parser.add_argument("--target-height", type=int, default=None, help="Target height after downscaling")
@@ -205,8 +2071,93 @@ def main():
     parser.add_argument("--color", default="green", help="Foreground color name or 256-code (e.g., '34' or 'green')")
     parser.add_argument("--bg", default="black", help="Background color name or 256-code (e.g., '40' or 'black')")
     parser.add_argument("--bold", action="store_true", help="Render text in bold/intense mode")
+    parser.add_argument("--colors", default=None, help="Per-cell colours from a file (or glob) laid out like the frames and coloured with ANSI escapes; frames with ANSI colours of their own need no sidecar")
+    parser.add_argument("--color-depth", choices=["auto", "16", "256", "truecolor"], default="auto", help="Colours the terminal can show; per-cell colours are reduced to fit (auto: from $COLORTERM and $TERM)")
+    parser.add_argument("--downscale", choices=["sample", "area"], default="sample", help="Downscale by picking every Nth cell (sample) or by averaging glyph density over each block (area)")
+    parser.add_argument("--ramp", default=DEFAULT_RAMP, help="Glyphs from lightest to densest, used by --downscale area")
+    parser.add_argument("--lazy", action="store_true", help="Memory-map a single-file source and decode frames on demand instead of loading them all; with a glob source, start playing while the files are still being read")
+    parser.add_argument("--load-threads", type=int, default=None, help="Threads reading the files of a glob source (default: Python's thread pool default)")
+    parser.add_argument("--frame-cache-size", type=float, default=256, help="Megabytes of compiled frames to keep under $XDG_CACHE_HOME/ascii-live/frames for fast restarts (0 disables)")
+    parser.add_argument("--no-numpy", action="store_true", help="Use the pure-Python scaling path even when NumPy is available")
+    parser.add_argument("--dedup", type=int, nargs="?", const=0, default=None, metavar="CELLS", help="Store repeated frames once: keep one copy of a source that repeats its loop, and hold runs of identical frames instead of redrawing them; with CELLS, frames differing from the run's first in at most that many cells count as repeats")
+    parser.add_argument("--redraw", choices=["diff", "full"], default="diff", help="Repaint only changed cells (diff) or the whole region every frame (full)")
+    parser.add_argument("--lag", choices=["drop", "slow"], default="drop", help="When playback falls behind: skip frames (drop) or slow the animation down (slow)")
+    parser.add_argument("--sync-output", action="store_true", help="Write frames from the timing loop instead of a writer thread that drops frames the output can't keep up with")
+    parser.add_argument("--stats", action="store_true", help="Print playback statistics on exit")
+    parser.add_argument("--profile", default=os.environ.get("ASCII_PROFILE") or None, help="Record per-phase frame timings and append them as JSON lines to this file ('-' for stderr; default: $ASCII_PROFILE)")
+    parser.add_argument("--profile-interval", type=float, default=5.0, help="Seconds between periodic --profile records (0 for only a final summary)")
+    parser.add_argument("--layer", action="append", default=None, metavar="SPEC", help="Composite several animations in one process; SPEC is comma-separated options, e.g. 'source=a.txt,corner=top-right,fps=10' (repeatable, later layers on top)")
+    parser.add_argument("--record", default=None, metavar="FILE", help="Also record the output, with its timing, to this asciicast v2 file")
+    parser.add_argument("--replay", default=None, metavar="FILE", help="Play back an asciicast v2 recording instead of an animation (with --headless: into --sink as fast as possible)")
+    parser.add_argument("--speed", type=float, default=1.0, help="--replay speed as a multiple of the recorded pace (0 for as fast as possible)")
+    parser.add_argument("--headless", action="store_true", help="Render as fast as possible into --sink instead of the terminal and print timing metrics as JSON")
+    parser.add_argument("--sink", default=os.devnull, help="Where --headless writes the rendered bytes ('-' for stdout, 'memory' to keep them in memory)")
+    parser.add_argument("--frames", type=int, default=None, help="Frames to render in --headless mode (default: one full cycle)")
+    parser.add_argument("--term-size", type=parse_term_size, default=None, help="Assume this terminal size, e.g. 120x30, instead of querying it")
     parser.add_argument("--new-window", action="store_true", help="Launch the animation in a new console window")
     parser.add_argument("--child", action="store_true", help="Internal flag to prevent re-spawn when launching new window")
+    return parser
+
+@contextlib.contextmanager
+def open_sink(spec):
+    # The stream --sink names and where to print the report
+    if spec == "-":
+        yield sys.stdout.buffer, sys.stderr
+        sys.stdout.flush()
+    elif spec == "memory":
+        yield io.BytesIO(), sys.stdout
+    else:
+        with open(spec, "wb") as sink:
+            yield sink, sys.stdout
+
+def replay(args):
+    if args.headless:
+        with open_sink(args.sink) as (sink, report):
+            metrics = replay_cast(args.replay, sink, 0)
+        metrics["source"] = args.replay
+        print(json.dumps(metrics), file=report)
+        return
+    enable_windows_ansi()
+    try:
+        replay_cast(args.replay, sys.stdout.buffer, args.speed)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sys.stdout.write(f"{ESC}[0m")
+        show_cursor()
+        sys.stdout.flush()
+
+def headless(args):
+    t0 = time.perf_counter()
+    frames_lines, colors, fps, lazy = load_animation(args)
+    t1 = time.perf_counter()
+    term_cols, term_rows = args.term_size or get_terminal_size()
+    anim = prepare_animation(args, frames_lines, term_cols, term_rows, lazy, colors)
+    t2 = time.perf_counter()
+    prof = PhaseProfiler(args.profile, args.profile_interval) if args.profile else None
+    recorder = CastRecorder(args.record, term_cols, term_rows) if args.record else None
+    with open_sink(args.sink) as (sink, report):
+        if recorder is not None:
+            sink = recorder.tee(sink)
+        metrics = run_headless(anim, sink, args.frames, prof)
+    if recorder is not None:
+        recorder.close()
+    if prof is not None:
+        prof.close()
+    metrics.update({
+        "source": args.source,
+        "load_s": t1 - t0,
+        "preprocess_s": t2 - t1,
+        "region": [anim.region_w, anim.region_h],
+        "fps": fps,
+    })
+    if isinstance(frames_lines, LineTable):
+        metrics["lines"] = frames_lines.line_count()
+        metrics["unique_lines"] = len(frames_lines.lines)
+    print(json.dumps(metrics), file=report)
+
+def main():
+    parser = build_parser()
     args = parser.parse_args()
 
     # Defaults when no CLI args provided
@@ -225,6 +2176,13 @@ def main():
         args.mode_cols = 640
         args.mode_lines = 240
 
+    if args.replay:
+        replay(args)
+        return
+    if args.headless:
+        headless(args)
+        return
+
     if args.new_window and not args.child:
         if os.name == "nt":
             child_argv = [sys.executable, os.path.abspath(__file__)]
@@ -252,138 +2210,112 @@ def main():
         else:
             set_windows_console_size(cols=args.mode_cols, lines=args.mode_lines)
 
-    # Load frames
-    if os.path.isfile(args.source):
-        frames = load_frames_from_single_file(args.source)
-    else:
-        frames = load_frames_from_files(args.source)
+    recorder = None
+    if args.record:
+        recorder = CastRecorder(args.record, *(args.term_size or get_terminal_size()))
+        recorder.capture_stdout()
 
-    frames_lines = [normalize_frame(f) for f in frames]
-    orig_w, orig_h = compute_max_dims(frames_lines)
-    target_w = None
-    target_h = None
-
-    term_cols, term_rows = get_terminal_size()
-    pad_x = max(0, args.pad_x)
-    pad_y = max(0, args.pad_y)
-    avail_cols = max(1, term_cols - pad_x)
-    avail_rows = max(1, term_rows - pad_y)
-
-    if args.fit is not None:
-        fit = max(0.05, min(1.0, args.fit))
-        target_w = max(1, int(math.floor(avail_cols * fit)))
-        target_h = max(1, int(math.floor(avail_rows * fit)))
-    elif args.target_width or args.target_height:
-        if args.target_width and args.target_height:
-            target_w, target_h = args.target_width, args.target_height
-        elif args.target_width:
-            target_w = args.target_width
-            target_h = max(1, int(round(orig_h * (target_w / max(1, orig_w)))))
-        else:
-            target_h = args.target_height
-            target_w = max(1, int(round(orig_w * (target_h / max(1, orig_h)))))
-    elif args.frame_width:
-        target_w = args.frame_width
-        target_h = max(1, int(round(orig_h * (target_w / max(1, orig_w)))))
-    else:
-        scale = max(0.02, min(1.0, args.scale if args.scale is not None else 1.0))
-        target_w = max(1, int(math.floor(orig_w * scale)))
-        target_h = max(1, int(math.floor(orig_h * scale)))
-        target_w = min(target_w, avail_cols)
-        target_h = min(target_h, avail_rows)
-
-    if args.square:
-        m = max(1, min(target_w or 1, target_h or 1))
-        target_w = m
-        target_h = m
-
-    if args.square_stretch:
-        term_cols, term_rows = get_terminal_size()
-        pad_x = max(0, args.pad_x)
-        max_w0, max_h0 = compute_max_dims(frames_lines)
-        desired = max(1, min(max_h0, term_cols - pad_x))
-        frames_lines = [stretch_x(lines, desired) for lines in frames_lines]
-        target_w = orig_w
-        target_h = orig_h
-
-    step_x = max(1, int(math.floor(orig_w / max(1, target_w))))
-    step_y = max(1, int(math.floor(orig_h / max(1, target_h))))
-
-    if step_x > 1 or step_y > 1:
-        def shrink_xy(lines):
-            out = []
-            for r in range(0, len(lines), step_y):
-                ln = lines[r]
-                out.append(ln[::step_x])
-            return out if out else [""]
-        frames_lines = [shrink_xy(lines) for lines in frames_lines]
-
-    max_w, max_h = compute_max_dims(frames_lines)
-    region_w = args.frame_width if args.frame_width and args.frame_width > 0 else max_w
-    region_h = max_h
-
-    cols, rows = term_cols, term_rows
-
-    region_w = max(1, min(region_w, max(1, cols - pad_x)))
-    region_h = max(1, min(region_h, max(1, rows - pad_y)))
+    if args.layer:
+        try:
+            composite(args, parser)
+        finally:
+            if recorder is not None:
+                recorder.close()
+        return
 
-    if args.corner == "top-left":
-        left = 1 + pad_x
-        top = 1 + pad_y
-    elif args.corner == "top-right":
-        left = max(1, cols - region_w - pad_x)
-        top = 1 + pad_y
-    elif args.corner == "bottom-left":
-        left = 1 + pad_x
-        top = max(1, rows - region_h - pad_y)
+    if args.lazy or args.frame_cache_size <= 0:
+        disk = None
+        frames_lines, colors, fps, lazy = load_animation(args)
     else:
-        left = max(1, cols - region_w - pad_x)
-        top = max(1, rows - region_h - pad_y)
-
-    delay = 1.0 / max(1e-6, args.fps)
-
-    def color_code(name, is_bg=False):
-        basic = {
-            "black": 30,
-            "red": 31,
-            "green": 32,
-            "yellow": 33,
-            "blue": 34,
-            "magenta": 35,
-            "cyan": 36,
-            "white": 37,
-        }
-        if isinstance(name, str) and name.isdigit():
-            code = int(name)
-            return code
-        base = basic.get(str(name).lower(), 32)
-        return base + 10 if is_bg else base
-
-    fg = color_code(args.color, is_bg=False)
-    bg = color_code(args.bg, is_bg=True)
-    bold_prefix = f"{ESC}[1m" if args.bold else ""
-    color_prefix = f"{bold_prefix}{ESC}[{fg}m{ESC}[{bg}m"
-    reset = f"{ESC}[0m"
+        # The source is only read if the layout isn't on disk already
+        disk = FrameCache(args, max_bytes=int(args.frame_cache_size * (1 << 20)))
+        frames_lines, colors, fps, lazy = None, None, source_fps(args), False
+    term_cols, term_rows = args.term_size or get_terminal_size()
+    layouts = LayoutCache(args, frames_lines, lazy, colors=colors, disk=disk)
+    anim = layouts.get(term_cols, term_rows)
+    # An explicit --term-size pins the layout
+    watcher = None if args.term_size else ResizeWatcher((term_cols, term_rows))
+    sched = FrameScheduler(fps, args.lag)
+    prof = PhaseProfiler(args.profile, args.profile_interval) if args.profile else None
+    out = sys.stdout.buffer
+    size = (term_cols, term_rows)
+    writer = None
 
     try:
         hide_cursor()
         # Pre-clear region once
-        clear_region(top, left, region_w, region_h)
+        clear_region(anim.top, anim.left, anim.region_w, anim.region_h)
+        sys.stdout.flush()
+        out.write(anim.intro)
+        out.flush()
+        shown = 0
+        tick = 0
+        writer = (InlineWriter if args.sync_output else ThreadedWriter)(out, anim, shown, prof)
+        writer.bytes = len(anim.intro)
+        sched.start()
         while True:
-            for lines in frames_lines:
-                # Erase previous frame region
-                clear_region(top, left, region_w, region_h)
-                # Draw current frame
-                for r, ln in enumerate(lines):
-                    move_cursor(top + r, left)
-                    sys.stdout.write(color_prefix + (ln[:region_w]).ljust(region_w) + reset)
-                sys.stdout.flush()
-                time.sleep(delay)
+            if prof is None:
+                steps = sched.wait()
+                tick = (tick + steps) % anim.ticks
+                target = anim.frame_at(tick)
+                if target != shown:
+                    writer.submit(anim, shown, target, anim.step(shown, target), size)
+            else:
+                t0 = time.perf_counter_ns()
+                steps = sched.wait()
+                t1 = time.perf_counter_ns()
+                prof.record("sleep", t1 - t0)
+                tick = (tick + steps) % anim.ticks
+                target = anim.frame_at(tick)
+                if target != shown:
+                    blob = anim.step(shown, target)
+                    t2 = time.perf_counter_ns()
+                    writer.submit(anim, shown, target, blob, size)
+                    prof.record("render", t2 - t1)
+            shown = target
+            if watcher is not None:
+                changed = watcher.changed()
+                ready = layouts.request(*changed) if changed is not None else layouts.poll()
+                if ready is not None and ready is not anim:
+                    # The writer repaints in the new layout; ticks line up
+                    # across layouts even where holds differ
+                    size = watcher.size
+                    if recorder is not None:
+                        recorder.resize(*size)
+                    shown = ready.frame_at(tick)
+                    writer.submit(ready, shown, shown, None, size, switch=True)
+                    anim = ready
     except KeyboardInterrupt:
         pass
     finally:
+        if writer is not None:
+            writer.close()
+        sys.stdout.write(anim.reset)
         show_cursor()
         sys.stdout.flush()
+        if prof is not None:
+            prof.close()
+        if watcher is not None:
+            watcher.close()
+        layouts.close()
+        if recorder is not None:
+            recorder.close()
+
+    if args.stats and sched.frames and writer is not None:
+        st = sched.summary()
+        full_bytes = len(anim.full_frame(0))
+        bytes_written = writer.bytes
+        per_frame = bytes_written / st["frames"]
+        print(f"frames: {st['frames']} in {st['elapsed']:.2f}s, {st['dropped']} dropped, {writer.dropped} dropped for output backpressure", file=sys.stderr)
+        print(f"fps: {st['fps']:.2f} achieved / {st['target_fps']:.2f} target", file=sys.stderr)
+        print(f"frame interval jitter: {st['jitter_ms']:.2f} ms (max interval {st['max_interval_ms']:.2f} ms)", file=sys.stderr)
+        print(f"bytes written: {bytes_written} ({per_frame:.0f} per frame)", file=sys.stderr)
+        table = layouts.frames_lines
+        if isinstance(table, LineTable):
+            print(f"lines: {len(table.lines)} unique of {table.line_count()} ({table.dedup_ratio():.1f}x dedup)", file=sys.stderr)
+        if anim.holds:
+            print(f"frames stored: {len(anim)} of {anim.ticks} ({anim.ticks - len(anim)} merged into holds)", file=sys.stderr)
+        print(f"full redraw: {full_bytes} per frame ({100.0 * (1 - per_frame / max(1, full_bytes)):.1f}% saved)", file=sys.stderr)
 
 if __name__ == "__main__":
     main()
@@ -1,27 +1,79 @@
+import io
 import os
-import re
 import argparse
+import itertools
+
+import framepack
 
 def read_text(path):
     with open(path, "r", encoding="utf-8") as f:
         return f.read()
 
+def iter_lines(f, chunk_size=1 << 16):
+    # Lines of a text file (without the newline), read chunk by chunk
+    tail = ""
+    for chunk in iter(lambda: f.read(chunk_size), ""):
+        lines = (tail + chunk).split("\n")
+        tail = lines.pop()
+        yield from lines
+    yield tail
+
+def iter_frames(f, chunk_size=1 << 16):
+    # Frames separated by blank lines, yielded as they complete. Same result
+    # as splitting the stripped text on blank lines: the first frame loses
+    # its leading whitespace and the last its trailing, which is why a
+    # frame is handed out only once the next one starts.
+    frame = []
+    done = None
+    started = False
+    for line in iter_lines(f, chunk_size):
+        if not line.strip():
+            if frame:
+                done = "\n".join(frame)
+                frame = []
+            continue
+        if done is not None:
+            yield done
+            done = None
+        if not started:
+            line = line.lstrip()
+            started = True
+        frame.append(line)
+    if frame:
+        yield "\n".join(frame).rstrip()
+    elif done is not None:
+        yield done.rstrip()
+
 def split_frames(text):
-    parts = re.split(r"\n\s*\n+", text.strip())
-    return [p for p in parts if p.strip()]
+    return list(iter_frames(io.StringIO(text)))
 
 def write_frames(frames, out_dir, prefix, pad, limit):
+    # Write each frame as it arrives; stop pulling frames at the limit
     os.makedirs(out_dir, exist_ok=True)
-    n = len(frames) if limit is None else min(len(frames), limit)
     paths = []
-    for i in range(n):
+    for i, frame in enumerate(itertools.islice(frames, limit)):
         name = f"{prefix}{str(i+1).zfill(pad)}.txt"
         path = os.path.join(out_dir, name)
         with open(path, "w", encoding="utf-8") as f:
-            f.write(frames[i])
+            f.write(frame)
         paths.append(path)
     return paths
 
+def read_frames(path):
+    # Generator over the frames of a pack or a blank-line separated text
+    # file; the text is read only as far as the frames consumed
+    if framepack.is_pack(path):
+        pack = framepack.FramePack(path)
+        for i in range(len(pack)):
+            yield pack[i]
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        yield from iter_frames(f)
+
+def write_pack(frames, path, limit, fps, keyframe):
+    framepack.write_pack(path, list(itertools.islice(frames, limit)), fps, keyframe)
+    return [path]
+
 def main():
     p = argparse.ArgumentParser()
     p.add_argument("--input", required=False, default=r"C:\\Users\\mohit\\ascii-live\\animations\\my-animation\\frame0001.txt.txt")
@@ -29,11 +81,16 @@ def main():
     p.add_argument("--prefix", default="frame")
     p.add_argument("--pad", type=int, default=4)
     p.add_argument("--limit", type=int, default=64)
+    p.add_argument("--pack", default=None, help="Write a single frame pack file instead of one text file per frame")
+    p.add_argument("--fps", type=float, default=0.0, help="Frame rate recorded in the pack header")
+    p.add_argument("--keyframe", type=int, default=30, help="Store a full frame every N frames in the pack")
     args = p.parse_args()
 
-    text = read_text(args.input)
-    frames = split_frames(text)
-    paths = write_frames(frames, args.dir, args.prefix, args.pad, args.limit)
+    frames = read_frames(args.input)
+    if args.pack:
+        paths = write_pack(frames, args.pack, args.limit, args.fps, args.keyframe)
+    else:
+        paths = write_frames(frames, args.dir, args.prefix, args.pad, args.limit)
     for pth in paths:
         print(pth)
 
@@ -0,0 +1,98 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+import goframes
+import build_frames
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "animations", "my-animation"))
+
+import play
+
+# Runs every animation through the player's load -> scale -> render pipeline
+# headlessly and reports where the time and bytes go. Arguments after the
+# benchmark's own options are passed to the player, e.g.
+#   python benchmark.py --json -- --scale 1 --redraw full
+
+class NullSink:
+    def write(self, data):
+        return len(data)
+
+def sources(animations_dir, frames_dir):
+    # (label, loader) pairs; a loader returns the raw frame strings
+    for route, source in build_frames.find_sources(animations_dir).items():
+        yield f"animations/{route}", lambda source=source: build_frames.load_source(source)[0]
+    for path in goframes.frame_files(frames_dir):
+        for anim in goframes.parse_file(path):
+            if anim.frames is None:
+                continue
+            label = f"frames/{os.path.basename(path)}:{anim.name}"
+            yield label, lambda path=path, name=anim.name: load_go_frames(path, name)
+
+def load_go_frames(path, name):
+    # Parse from scratch so load time includes the parser
+    for anim in goframes.parse_file(path, use_cache=False):
+        if anim.name == name:
+            return anim.frames
+    return []
+
+def bench_one(loader, player_args, term_cols, term_rows, cycles):
+    t0 = time.perf_counter()
+    frames = loader()
+    t1 = time.perf_counter()
+    frames_lines, colors = play.split_colors(frames)
+    anim = play.prepare_animation(player_args, frames_lines, term_cols, term_rows, colors=colors)
+    t2 = time.perf_counter()
+    metrics = play.run_headless(anim, NullSink(), anim.ticks * cycles)
+    return {
+        "frames": len(frames),
+        "region": [anim.region_w, anim.region_h],
+        "load_s": t1 - t0,
+        "preprocess_s": t2 - t1,
+        "us_per_frame": metrics["us_per_frame"],
+        "bytes_per_frame": metrics["bytes_per_frame"],
+    }
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark the player pipeline on every animation")
+    p.add_argument("--animations", default=os.path.join(ROOT, "animations"), help="Directory of animation sources")
+    p.add_argument("--frames-dir", default=None, help="Directory of Go frame files (default: frames/)")
+    p.add_argument("--term-size", type=play.parse_term_size, default=(120, 30), help="Terminal size to lay out for, e.g. 120x30")
+    p.add_argument("--cycles", type=int, default=3, help="Animation cycles to render per source")
+    p.add_argument("--json", action="store_true", help="Print one JSON document instead of a table")
+    p.add_argument("--output", default=None, help="Also write the JSON results to this file")
+    p.add_argument("player_args", nargs=argparse.REMAINDER, help="Arguments for the player, after --")
+    args = p.parse_args()
+
+    extra = args.player_args[1:] if args.player_args[:1] == ["--"] else args.player_args
+    player_args = play.build_parser().parse_args(extra)
+    term_cols, term_rows = args.term_size
+
+    results = []
+    for label, loader in sources(args.animations, args.frames_dir):
+        row = bench_one(loader, player_args, term_cols, term_rows, max(1, args.cycles))
+        row["source"] = label
+        results.append(row)
+        if not args.json:
+            print(f"{label:<42} {row['frames']:>5} frames  load {row['load_s'] * 1e3:8.2f} ms  "
+                  f"prep {row['preprocess_s'] * 1e3:8.2f} ms  {row['us_per_frame']:8.2f} us/frame  "
+                  f"{row['bytes_per_frame']:9.0f} B/frame")
+
+    report = {
+        "python": sys.version.split()[0],
+        "numpy": play.np is not None and not player_args.no_numpy,
+        "term_size": [term_cols, term_rows],
+        "player_args": extra,
+        "results": results,
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
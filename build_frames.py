@@ -0,0 +1,211 @@
+import os
+import re
+import sys
+import json
+import glob
+import hashlib
+import collections
+import argparse
+import concurrent.futures
+
+import goframes
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "animations", "my-animation"))
+
+import play
+import framepack
+
+MANIFEST = ".frames-manifest.json"
+# Per-frame files in an animation directory: frame1.txt, frame0001.txt, ...
+FRAME_FILE = re.compile(r"frame\d+\.txt$")
+# Hand-written files in frames/ that no source may be generated over
+RESERVED_ROUTES = {"frames"}
+
+def animation_names(name):
+    # "my-animation" -> ("MyAnimation", "myAnimationFrames")
+    words = [w for w in re.split(r"[^0-9A-Za-z]+", name) if w]
+    camel = "".join(w[:1].upper() + w[1:] for w in words) or "Animation"
+    if camel[0].isdigit():
+        camel = "A" + camel
+    return camel, camel[0].lower() + camel[1:] + "Frames"
+
+def route_name(name):
+    # "Blob One.txt" -> "blob-one"
+    return re.sub(r"[^0-9a-z]+", "-", name.lower()).strip("-") or "animation"
+
+# An animation's input files; `single` is one text blob or frame pack
+# rather than one file per frame
+Source = collections.namedtuple("Source", "files single")
+
+def find_sources(src_dir):
+    # Route name -> Source. A directory of numbered frameN.txt files is
+    # one animation; so is a lone text blob or frame pack.
+    sources = {}
+    for entry in sorted(os.scandir(src_dir), key=lambda e: e.name):
+        if entry.is_dir():
+            files = [p for p in glob.glob(os.path.join(entry.path, "frame*.txt")) if FRAME_FILE.match(os.path.basename(p))]
+            if files:
+                files = sorted(files, key=lambda p: play.natural_key(os.path.basename(p)))
+                sources[route_name(entry.name)] = Source(files, False)
+                continue
+            files = glob.glob(os.path.join(entry.path, "*.ascf")) or glob.glob(os.path.join(entry.path, "*.txt"))
+            if files:
+                sources[route_name(entry.name)] = Source(sorted(files)[:1], True)
+        elif entry.name.endswith((".txt", ".ascf")):
+            sources[route_name(os.path.splitext(entry.name)[0])] = Source([entry.path], True)
+    return sources
+
+def source_hash(files, options):
+    h = hashlib.sha256(json.dumps(options, sort_keys=True).encode("utf-8"))
+    for path in files:
+        h.update(os.path.basename(path).encode("utf-8") + b"\0")
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        h.update(b"\0")
+    return h.hexdigest()
+
+def load_source(source):
+    # (frames, sleep_ms or None) for one animation's inputs
+    if source.single:
+        path = source.files[0]
+        if framepack.is_pack(path):
+            pack = framepack.FramePack(path)
+            sleep_ms = 1000.0 / pack.fps if pack.fps > 0 else None
+            return [pack[i] for i in range(len(pack))], sleep_ms
+        return play.load_frames_from_single_file(path), None
+    frames = []
+    for path in source.files:
+        with open(path, "r", encoding="utf-8") as f:
+            frames.append(f.read())
+    return frames, None
+
+def build_one(job):
+    # Runs in a worker process: read one animation and write its Go file
+    name, source, out_path, options = job
+    frames, sleep_ms = load_source(source)
+    if options.get("trim_loops"):
+        frames = frames[:play.cycle_length(frames)]
+    if options.get("sleep_ms") is not None:
+        sleep_ms = options["sleep_ms"]
+    if options.get("collapse_holds"):
+        frames, sleep_ms = goframes.collapse_holds(frames, sleep_ms)
+    var, frames_var = animation_names(name)
+    size = goframes.write_go_file(out_path, var, frames_var, frames, sleep_ms)
+    return name, var, len(frames), size
+
+def load_manifest(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(path, manifest):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+def build_clashes(out_dir, names, manifest):
+    # Messages for sources that would overwrite a Go file build_frames.py
+    # didn't generate (frames.go, time.go, ...), or would generate Go
+    # identifiers that another file in out_dir already declares or that
+    # two sources share (gina-2 and gina2 both give Gina2)
+    declared = {}
+    for path in goframes.frame_files(out_dir):
+        for anim in goframes.parse_file(path):
+            for ident in (anim.name, anim.frames_var):
+                if ident:
+                    declared.setdefault(ident, os.path.abspath(path))
+    frames_go = os.path.join(out_dir, "frames.go")
+    if os.path.exists(frames_go):
+        with open(frames_go, "r", encoding="utf-8") as f:
+            for ident in re.findall(r"^(?:var|func|type|const)\s+(\w+)", f.read(), re.M):
+                declared.setdefault(ident, os.path.abspath(frames_go))
+    clashes = []
+    generated = {}
+    for name in names:
+        own = os.path.abspath(os.path.join(out_dir, f"{name}.go"))
+        if name in RESERVED_ROUTES or (name not in manifest and os.path.exists(own)):
+            clashes.append(f"{name}.go already exists and wasn't generated from a source")
+            continue
+        for ident in animation_names(name):
+            other = declared.get(ident)
+            if other is not None and other != own:
+                clashes.append(f"{name}.go would declare {ident}, already declared in {os.path.basename(other)}")
+            elif ident in generated:
+                clashes.append(f"{name}.go would declare {ident}, also generated for {generated[ident]}.go")
+            generated.setdefault(ident, name)
+    return clashes
+
+def update_frame_map(frames_go, routes):
+    # Add missing `"route": Var,` entries to FrameMap, keeping its alignment
+    existing = goframes.parse_frame_map(frames_go)
+    missing = {route: var for route, var in routes.items() if route not in existing}
+    if not missing:
+        return []
+    with open(frames_go, "r", encoding="utf-8") as f:
+        content = f.read()
+    start = content.index("var FrameMap")
+    end = content.index("\n}", start)
+    width = max(len(f'"{route}":') + 1 for route in list(existing) + list(missing))
+    lines = []
+    for route, var in sorted(missing.items()):
+        key = f'"{route}":'
+        lines.append(f"    {key:<{width}}{var},")
+    content = content[:end] + "\n" + "\n".join(lines) + content[end:]
+    with open(frames_go, "w", encoding="utf-8", newline="\n") as f:
+        f.write(content)
+    return sorted(missing)
+
+def main():
+    p = argparse.ArgumentParser(description="Generate frames/*.go from animation sources")
+    p.add_argument("src", nargs="?", default=os.path.join(ROOT, "animations"), help="Directory of animation sources")
+    p.add_argument("--out", default=goframes.FRAMES_DIR, help="Directory to write the Go files to")
+    p.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    p.add_argument("--sleep", type=float, default=None, help="Frame delay in ms for every animation (default: from the source, else 70)")
+    p.add_argument("--trim-loops", action="store_true", help="Keep one cycle of sources that are repeated copies of the same loop")
+    p.add_argument("--collapse-holds", action="store_true", help="Store runs of repeated frames once per sleep, lengthening the sleep to match, when every run allows it")
+    p.add_argument("--force", action="store_true", help="Rebuild even when the inputs are unchanged")
+    p.add_argument("--no-framemap", action="store_true", help="Don't add new animations to FrameMap in frames.go")
+    args = p.parse_args()
+
+    options = {"sleep_ms": args.sleep, "trim_loops": args.trim_loops, "collapse_holds": args.collapse_holds}
+    manifest_path = os.path.join(args.out, MANIFEST)
+    manifest = load_manifest(manifest_path)
+    jobs = []
+    hashes = {}
+    skipped = 0
+    sources = find_sources(args.src)
+    clashes = build_clashes(args.out, sources, manifest)
+    if clashes:
+        p.error("rename these sources:\n  " + "\n  ".join(clashes))
+    for name, source in sources.items():
+        out_path = os.path.join(args.out, f"{name}.go")
+        digest = source_hash(source.files, options)
+        hashes[name] = digest
+        if not args.force and manifest.get(name, {}).get("hash") == digest and os.path.exists(out_path):
+            skipped += 1
+            continue
+        jobs.append((name, source, out_path, options))
+
+    routes = {}
+    if jobs:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            for name, var, count, size in pool.map(build_one, jobs):
+                manifest[name] = {"hash": hashes[name], "var": var}
+                routes[name] = var
+                print(f"{name}.go: {count} frames, {size} bytes")
+        save_manifest(manifest_path, manifest)
+    print(f"built {len(jobs)}, unchanged {skipped}")
+
+    if routes and not args.no_framemap:
+        frames_go = os.path.join(args.out, "frames.go")
+        if os.path.exists(frames_go):
+            for route in update_frame_map(frames_go, routes):
+                print(f"added {route} to FrameMap")
+
+if __name__ == "__main__":
+    main()
@@ -1,70 +1,65 @@
 import os
+import argparse
 
-def convert_gina2():
-    input_path = r'c:\Users\mohit\ascii-live\frames\gina2.go'
-    output_path = r'c:\Users\mohit\ascii-live\frames\gina2.go'
+import goframes
+from detect_frame_height import MIN_CONFIDENCE, detect_frame_height
 
-    with open(input_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
+def convert_gina2(input_path=None, output_path=None, lines_per_frame=None):
+    input_path = input_path or os.path.join(goframes.FRAMES_DIR, "gina2.go")
+    output_path = output_path or input_path
 
-    # Configuration
-    lines_per_frame = 98
-    total_frames = 67
-    
-    frames = []
-    current_frame = []
-    
-    for i, line in enumerate(lines):
-        # Remove the newline character for processing, but keep it for the string
-        # Actually, we want to reconstruct the frame string.
-        # The raw file has newlines.
-        
-        # Check if we are at a split point
-        if (i + 1) % lines_per_frame == 0:
-            # This is the last line of a frame (likely empty or separator)
-            # Based on observation, line 98 is empty.
-            # So we append the accumulated lines to frames list
-            # We exclude the separator line if it's just empty/padding
-            # Let's include it if it's part of the art, but previous analysis said it's empty.
-            # Let's just join what we have.
-            frames.append("".join(current_frame))
-            current_frame = []
-        else:
-            current_frame.append(line)
-            
-    # Handle any remaining lines if they didn't hit the modulo (e.g. last frame)
-    if current_frame:
-        frames.append("".join(current_frame))
-
-    print(f"Total frames found: {len(frames)}")
-    
-    # Construct Go file content
-    go_content = """package frames
+    anim = goframes.load_animation(input_path)
+    if anim is not None:
+        name, frames_var, sleep_ms = anim.name, anim.frames_var or anim.name + "Frames", anim.sleep_ms
+        frames = anim.frames
+    else:
+        # Raw text dump rather than a Go frame file
+        name, frames_var, sleep_ms = "Gina2", "Gina2Frames", 100
+        frames = []
+        with open(input_path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
 
-import "time"
+        if lines_per_frame is None:
+            lines_per_frame, confidence = detect_frame_height([ln.rstrip("\n") for ln in lines])
+            if lines_per_frame is None:
+                print("Could not detect the frame height.")
+                return
+            print(f"Detected {lines_per_frame} lines per frame (confidence {confidence:.2f})")
+            if confidence < MIN_CONFIDENCE:
+                print("Confidence too low to convert; pass --lines-per-frame to choose one.")
+                return
 
-var Gina2 = FrameType{
-	GetFrame:  DefaultGetFrame(Gina2Frames),
-	GetLength: DefaultGetLength(Gina2Frames),
-	GetSleep: func() time.Duration {
-		return time.Millisecond * 100
-	},
-}
+        # The last frame may lack its separator line, but no other
+        # remainder fits
+        leftover = len(lines) % lines_per_frame
+        if leftover not in (0, lines_per_frame - 1):
+            print(f"{len(lines)} lines don't split into frames of {lines_per_frame} ({leftover} left over); not converting.")
+            return
 
-var Gina2Frames = []string{
-"""
+        current_frame = []
+        for i, line in enumerate(lines):
+            # Every lines_per_frame-th line is an empty separator; the lines
+            # before it, newlines included, make up one frame.
+            if (i + 1) % lines_per_frame == 0:
+                frames.append("".join(current_frame))
+                current_frame = []
+            else:
+                current_frame.append(line)
 
-    for frame in frames:
-        # Escape backticks if any (though we checked and found none)
-        safe_frame = frame.replace("`", "` + \"`\" + `")
-        go_content += f"\t`{safe_frame}`,\n"
+        # Handle any remaining lines if they didn't hit the modulo (e.g. last frame)
+        if current_frame:
+            frames.append("".join(current_frame))
 
-    go_content += "}\n"
+    print(f"Total frames found: {len(frames)}")
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(go_content)
+    goframes.write_go_file(output_path, name, frames_var, frames, sleep_ms)
 
     print(f"Successfully wrote Go code to {output_path}")
 
 if __name__ == "__main__":
-    convert_gina2()
+    p = argparse.ArgumentParser(description="Convert a raw frame dump into the Gina2 Go frame file")
+    p.add_argument("input", nargs="?", default=None, help="Raw dump or Go frame file (default: frames/gina2.go)")
+    p.add_argument("output", nargs="?", default=None, help="Go file to write (default: the input)")
+    p.add_argument("--lines-per-frame", type=int, default=None, help="Lines per frame including the separator (default: detected)")
+    args = p.parse_args()
+    convert_gina2(args.input, args.output, args.lines_per_frame)
@@ -1,54 +1,118 @@
-import re
-
-def detect_height():
-    path = r"c:\Users\mohit\ascii-live\frames\gina.go"
-    with open(path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Extract content between backticks
-    # The file structure is `...`,\n`...`, etc.
-    # We can just split by backticks.
-    parts = content.split('`')
-    # parts[0] is header
-    # parts[1] is frame 1
-    # parts[2] is comma/newline
-    # parts[3] is frame 2
-    # ...
-    
-    # Let's look at frame 1
-    if len(parts) < 2:
+import os
+import operator
+import argparse
+
+import goframes
+
+MAX_HEIGHT = 512
+# A height needs at least this many lines (and this fraction of all lines)
+# matching the line one frame later to count at all, and FULL_SUPPORT
+# matching lines for full confidence; a few coincidental matches in a
+# short file are no evidence
+MIN_MATCHES = 8
+MIN_SCORE = 0.01
+FULL_SUPPORT = 64
+# Below this (a well supported height that doesn't outscore every rival by
+# a third), callers shouldn't rewrite files based on a detected height
+MIN_CONFIDENCE = 0.25
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+def line_ids(lines):
+    # Hash every line once: equal lines get equal small integer ids
+    table = {}
+    return [table.setdefault(line, len(table)) for line in lines]
+
+def lag_scores(ids, min_height, max_height):
+    # Fraction of lines equal to the line `lag` positions later, per lag;
+    # the autocorrelation of the line sequence under exact matching.
+    n = len(ids)
+    scores = {}
+    if np is not None:
+        arr = np.asarray(ids, dtype=np.int64)
+        for lag in range(min_height, max_height + 1):
+            scores[lag] = int(np.count_nonzero(arr[:-lag] == arr[lag:])) / (n - lag)
+    else:
+        for lag in range(min_height, max_height + 1):
+            scores[lag] = sum(map(operator.eq, ids, ids[lag:])) / (n - lag)
+    return scores
+
+def rank_frame_heights(lines, min_height=2, max_height=None):
+    # Candidate frame heights as (height, score, confidence), best first.
+    # Multiples of the true height score about as well as it does, so a
+    # candidate is preferred over any larger lag it divides that does not
+    # score clearly better.
+    ids = line_ids(lines)
+    n = len(ids)
+    if max_height is None:
+        max_height = min(n // 2, MAX_HEIGHT)
+    max_height = min(max_height, n - 1)
+    if n < 2 or max_height < min_height:
+        return []
+    scores = lag_scores(ids, min_height, max_height)
+    scores = {lag: score for lag, score in scores.items() if score >= MIN_SCORE and round(score * (n - lag)) >= MIN_MATCHES}
+    if not scores:
+        return []
+    ranked = []
+    for lag, score in sorted(scores.items(), key=lambda kv: (-kv[1], kv[0])):
+        if any(lag % h == 0 and score <= s * 1.05 for h, s in ranked):
+            continue
+        ranked.append((lag, score))
+    # Among candidates scoring close to the best, the smallest lag wins
+    best = ranked[0][1]
+    ranked = sorted((c for c in ranked if c[1] >= best * 0.95), key=lambda c: c[0]) + [c for c in ranked if c[1] < best * 0.95]
+    # Confidence is the margin over the strongest competing candidate,
+    # scaled down while few lines support the lag. Multiples and divisors
+    # of a lag support it rather than compete.
+    out = []
+    for lag, score in ranked:
+        rival = max((s for h, s in ranked if lag % h and h % lag), default=0.0)
+        support = min(1.0, score * (n - lag) / FULL_SUPPORT)
+        out.append((lag, score, max(0.0, 1.0 - rival / score) * support))
+    return out
+
+def detect_frame_height(lines, min_height=2, max_height=None):
+    # (height, confidence) of the most likely frame height, or (None, 0.0)
+    ranked = rank_frame_heights(lines, min_height, max_height)
+    if not ranked:
+        return None, 0.0
+    return ranked[0][0], ranked[0][2]
+
+def read_lines(path):
+    frames = goframes.load_frames(path) if path.endswith(".go") else []
+    if frames:
+        return goframes.frame_lines(frames)
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().split("\n")
+
+def detect_height(path=None, min_height=2, max_height=None, top=5):
+    path = path or os.path.join(goframes.FRAMES_DIR, "gina.go")
+    all_lines = read_lines(path)
+    if not all_lines:
         print("Could not find frames.")
-        return
-
-    # Reconstruct the full raw lines from all frames to check periodicity
-    all_lines = []
-    # The odd indices should be the frames (1, 3, 5...)
-    for i in range(1, len(parts), 2):
-        frame_str = parts[i]
-        lines = frame_str.strip().split('\n')
-        all_lines.extend(lines)
-        
+        return None
+
     print(f"Total lines extracted: {len(all_lines)}")
-    
-    if not all_lines:
-        return
-
-    first_line = all_lines[0]
-    print(f"First line: {first_line[:50]}...")
-    
-    # Find occurrences of the first line
-    matches = []
-    for i, line in enumerate(all_lines):
-        if line == first_line:
-            matches.append(i)
-            
-    print(f"First line repeats at indices: {matches}")
-    
-    if len(matches) > 1:
-        diffs = [matches[i+1] - matches[i] for i in range(len(matches)-1)]
-        print(f"Differences (Frame Heights): {diffs}")
-    else:
-        print("First line does not repeat exactly. Checking fuzzy match or other lines.")
+    ranked = rank_frame_heights(all_lines, min_height, max_height)
+    if not ranked:
+        print("No frame height is supported by enough repeated lines.")
+        return None
+    for height, score, confidence in ranked[:top]:
+        frames = len(all_lines) / height
+        print(f"height {height}: {score:.1%} of lines repeat, confidence {confidence:.2f}, {frames:.2f} frames")
+    return ranked[0][0]
+
+def main():
+    p = argparse.ArgumentParser(description="Detect the frame height of concatenated ASCII frames")
+    p.add_argument("path", nargs="?", default=None, help="Go frame file or plain text dump (default: frames/gina.go)")
+    p.add_argument("--min", type=int, default=2, help="Smallest frame height to consider")
+    p.add_argument("--max", type=int, default=None, help=f"Largest frame height to consider (default: {MAX_HEIGHT} or half the lines)")
+    p.add_argument("--top", type=int, default=5, help="Number of candidates to print")
+    args = p.parse_args()
+    detect_height(args.path, args.min, args.max, args.top)
 
 if __name__ == "__main__":
-    detect_height()
+    main()
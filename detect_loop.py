@@ -0,0 +1,114 @@
+import os
+import sys
+import argparse
+
+import goframes
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "animations", "my-animation"))
+
+import play
+import framepack
+import split_frames
+
+# Finds animations that are several copies of one loop concatenated, or
+# that hold frames by repeating them, and trims them to a single cycle with
+# the holds folded into the sleep. Loops and holds are found by comparing
+# whole frames, so only exact repeats are removed.
+
+def read_frames(path):
+    # (frames, Go animation or None, fps or 0.0) for a Go frame file, frame
+    # pack, text blob or glob of frame files
+    if path.endswith(".go"):
+        for anim in goframes.parse_file(path):
+            if anim.frames is not None:
+                return anim.frames, anim, 0.0
+        return [], None, 0.0
+    if os.path.isfile(path) and framepack.is_pack(path):
+        pack = framepack.FramePack(path)
+        return [pack[i] for i in range(len(pack))], None, pack.fps
+    if os.path.isfile(path):
+        return play.load_frames_from_single_file(path), None, 0.0
+    return play.load_frames_from_files(path), None, 0.0
+
+def frame_bytes(frames):
+    return sum(len(frame.encode("utf-8")) for frame in frames)
+
+def report_holds(frames, near=None):
+    # Print how many frames only repeat (or, within `near` cells, nearly
+    # repeat) the frame before them; returns the exact repeats
+    n = len(frames)
+    keep, holds = play.dedup_frames(frames)
+    runs = [h for h in holds if h > 1]
+    print(f"Repeated frames: {n - len(keep)} of {n} repeat the frame before ({len(runs)} holds, longest {max(holds)})")
+    repeated = n - len(keep)
+    if near:
+        table = play.LineTable(play.normalize_frame(frame) for frame in frames)
+        width, height = table.dims()
+        keep, _ = play.dedup_frames(table.grids(width, height), threshold=near)
+        print(f"Within {near} cells of the frame starting their run: {n - len(keep)} of {n}")
+    return repeated
+
+def detect_loop(path=None, write=False, pack=None, collapse=False, near=None):
+    path = path or os.path.join(goframes.FRAMES_DIR, "gina.go")
+    frames, anim, fps = read_frames(path)
+    if not frames:
+        print("Could not find frames.")
+        return None
+
+    n = len(frames)
+    period = play.minimal_period(frames)
+    cycle = play.cycle_length(frames)
+    print(f"Total frames: {n}")
+    if cycle < n:
+        print(f"Loop of {cycle} frames repeated {n // cycle} times")
+    elif period < n:
+        print(f"Frames repeat every {period}, but the last copy is cut short ({n % period} of {period} frames); not trimming.")
+    else:
+        print("No repeating loop found.")
+    repeated = report_holds(frames[:cycle], near)
+
+    out = frames[:cycle]
+    sleep_ms = anim.sleep_ms if anim is not None else None
+    if collapse:
+        out, sleep_ms = goframes.collapse_holds(out, sleep_ms)
+        if len(out) < cycle:
+            factor = cycle // len(out)
+            print(f"Holds collapse to {len(out)} frames, each shown {factor}x as long")
+            if fps > 0:
+                fps /= factor
+        elif repeated:
+            print("Holds can't be collapsed without changing the timing.")
+    if len(out) == n:
+        return n
+    before = frame_bytes(frames)
+    after = frame_bytes(out)
+    print(f"Result: {len(out)} of {n} frames, {after} of {before} frame bytes ({100.0 * (1 - after / max(1, before)):.1f}% saved)")
+    if anim is not None:
+        go_before = len(goframes.render_go_file(anim.name, anim.frames_var, frames, anim.sleep_ms))
+        go_after = len(goframes.render_go_file(anim.name, anim.frames_var, out, sleep_ms))
+        print(f"Go file: {go_after} of {go_before} bytes")
+
+    if write:
+        if anim is None:
+            print("--write only rewrites Go frame files; use --pack for other sources.")
+        else:
+            goframes.write_go_file(path, anim.name, anim.frames_var, out, sleep_ms)
+            print(f"Rewrote {path} with {len(out)} frames")
+    if pack:
+        split_frames.write_pack(out, pack, None, fps, 30)
+        print(f"Wrote {len(out)} frames to {pack}")
+    return len(out)
+
+def main():
+    p = argparse.ArgumentParser(description="Report loops and repeated frames in an animation and trim it to one cycle")
+    p.add_argument("path", nargs="?", default=None, help="Go frame file, frame pack, text blob or glob of frame files (default: frames/gina.go)")
+    p.add_argument("--collapse-holds", action="store_true", help="Also store runs of repeated frames once per sleep, lengthening the sleep to match, when every run allows it")
+    p.add_argument("--near", type=int, default=None, metavar="CELLS", help="Also count frames within this many changed cells of their run's first frame")
+    p.add_argument("--write", action="store_true", help="Rewrite a Go frame file with the result")
+    p.add_argument("--pack", default=None, help="Write the result to this frame pack")
+    args = p.parse_args()
+    detect_loop(args.path, args.write, args.pack, args.collapse_holds, args.near)
+
+if __name__ == "__main__":
+    main()
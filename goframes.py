@@ -0,0 +1,350 @@
+import io
+import os
+import re
+import sys
+import glob
+import math
+import pickle
+import hashlib
+import argparse
+import itertools
+import collections
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "animations", "my-animation"))
+
+import play
+
+# Reads and writes the frames/*.go animation files. Sources are tokenized in a
+# single regex pass (raw and interpreted strings, comments, identifiers), so
+# backticks escaped as `...` + "`" + `...` come back as part of the frame.
+
+FRAMES_DIR = os.path.join(ROOT, "frames")
+DEFAULT_SLEEP_MS = 70
+
+GoAnimation = collections.namedtuple("GoAnimation", "name frames_var frames sleep_ms")
+
+TOKEN = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<raw>`[^`]*`)
+  | (?P<str>"(?:[^"\\\n]|\\.)*")
+  | (?P<rune>'(?:[^'\\\n]|\\.)*')
+  | (?P<num>\d+(?:\.\d+)?)
+  | (?P<ident>[^\W\d]\w*)
+  | (?P<op>.)
+""", re.S | re.X)
+
+GO_ESCAPES = {
+    "a": 7, "b": 8, "f": 12, "n": 10, "r": 13, "t": 9, "v": 11,
+    "\\": 92, "'": 39, '"': 34,
+}
+
+DURATION_MS = {
+    "Nanosecond": 1e-6,
+    "Microsecond": 1e-3,
+    "Millisecond": 1.0,
+    "Second": 1000.0,
+    "Minute": 60000.0,
+}
+
+def unquote_go(literal):
+    body = literal[1:-1]
+    out = bytearray()
+    i = 0
+    while i < len(body):
+        ch = body[i]
+        if ch != "\\":
+            out += ch.encode("utf-8")
+            i += 1
+            continue
+        esc = body[i + 1]
+        if esc in GO_ESCAPES:
+            out.append(GO_ESCAPES[esc])
+            i += 2
+        elif esc == "x":
+            out.append(int(body[i + 2:i + 4], 16))
+            i += 4
+        elif esc in "uU":
+            size = 4 if esc == "u" else 8
+            out += chr(int(body[i + 2:i + 2 + size], 16)).encode("utf-8")
+            i += 2 + size
+        else:
+            out.append(int(body[i + 1:i + 4], 8) & 0xFF)
+            i += 4
+    return out.decode("utf-8", errors="replace")
+
+def tokenize(text):
+    for m in TOKEN.finditer(text):
+        kind = m.lastgroup
+        if kind in ("ws", "comment"):
+            continue
+        value = m.group()
+        if kind == "raw":
+            # Go drops carriage returns from raw strings
+            yield "str", value[1:-1].replace("\r", "")
+        elif kind == "str":
+            yield "str", unquote_go(value)
+        else:
+            yield kind, value
+
+def _match_close(tokens, i):
+    # Index of the bracket closing the one at tokens[i]
+    opening = tokens[i][1]
+    closing = {"{": "}", "(": ")", "[": "]"}[opening]
+    depth = 0
+    for j in range(i, len(tokens)):
+        kind, value = tokens[j]
+        if kind != "op":
+            continue
+        if value == opening:
+            depth += 1
+        elif value == closing:
+            depth -= 1
+            if depth == 0:
+                return j
+    return len(tokens) - 1
+
+def _string_list(tokens, start, end):
+    # Elements of a []string{...} literal; each is one or more string
+    # literals joined with +. Returns None if anything else shows up.
+    frames = []
+    parts = []
+    for kind, value in tokens[start:end]:
+        if kind == "str":
+            parts.append(value)
+        elif (kind, value) == ("op", "+"):
+            continue
+        elif (kind, value) == ("op", ","):
+            if parts:
+                frames.append("".join(parts))
+            parts = []
+        else:
+            return None
+    if parts:
+        frames.append("".join(parts))
+    return frames
+
+def _duration_ms(tokens):
+    # Value of the first `time.Unit * N` (either order) in a GetSleep body
+    number = None
+    unit = None
+    for kind, value in tokens:
+        if kind == "num" and number is None:
+            number = float(value)
+        elif kind == "ident" and value in DURATION_MS and unit is None:
+            unit = DURATION_MS[value]
+    if unit is None:
+        return None
+    return (1.0 if number is None else number) * unit
+
+def _frame_type_fields(tokens, start, end):
+    frames_var = None
+    sleep_ms = DEFAULT_SLEEP_MS
+    i = start
+    while i < end:
+        kind, value = tokens[i]
+        if kind == "ident" and i + 1 < end and tokens[i + 1] == ("op", ":"):
+            field = value
+            j = i + 2
+            # The field's expression runs to the next top-level comma
+            k = j
+            while k < end and tokens[k] != ("op", ","):
+                if tokens[k][0] == "op" and tokens[k][1] in "({[":
+                    k = _match_close(tokens, k)
+                k += 1
+            expr = tokens[j:k]
+            if field == "GetFrame" and len(expr) == 4 and expr[0] == ("ident", "DefaultGetFrame"):
+                frames_var = expr[2][1]
+            elif field == "GetSleep":
+                if expr and expr[0] == ("ident", "DefaultGetSleep"):
+                    sleep_ms = DEFAULT_SLEEP_MS
+                else:
+                    sleep_ms = _duration_ms(expr)
+            i = k
+        i += 1
+    return frames_var, sleep_ms
+
+def parse_go_source(text):
+    tokens = list(tokenize(text))
+    arrays = {}
+    decls = []
+    i = 0
+    n = len(tokens)
+    while i < n:
+        if tokens[i] == ("ident", "var") and i + 2 < n and tokens[i + 1][0] == "ident" and tokens[i + 2] == ("op", "="):
+            name = tokens[i + 1][1]
+            j = i + 3
+            head = tokens[j:j + 4]
+            if head == [("op", "["), ("op", "]"), ("ident", "string"), ("op", "{")]:
+                close = _match_close(tokens, j + 3)
+                frames = _string_list(tokens, j + 4, close)
+                if frames is not None:
+                    arrays[name] = frames
+                i = close + 1
+                continue
+            if head[:2] == [("ident", "DefaultFrameType"), ("op", "(")] and j + 3 < n and tokens[j + 2][0] == "ident":
+                decls.append((name, tokens[j + 2][1], DEFAULT_SLEEP_MS))
+                i = j + 4
+                continue
+            if head[:2] == [("ident", "FrameType"), ("op", "{")]:
+                close = _match_close(tokens, j + 1)
+                frames_var, sleep_ms = _frame_type_fields(tokens, j + 2, close)
+                decls.append((name, frames_var, sleep_ms))
+                i = close + 1
+                continue
+        i += 1
+    return [GoAnimation(name, var, arrays.get(var), sleep) for name, var, sleep in decls]
+
+def parse_frame_map(path=None):
+    # FrameMap route names -> animation variable names, from frames.go
+    path = path or os.path.join(FRAMES_DIR, "frames.go")
+    with open(path, "r", encoding="utf-8") as f:
+        tokens = list(tokenize(f.read()))
+    routes = {}
+    for i, tok in enumerate(tokens):
+        if tok == ("ident", "FrameMap"):
+            j = i
+            while j < len(tokens) and tokens[j] != ("op", "{"):
+                j += 1
+            close = _match_close(tokens, j)
+            k = j + 1
+            while k + 2 < close:
+                if tokens[k][0] == "str" and tokens[k + 1] == ("op", ":") and tokens[k + 2][0] == "ident":
+                    routes[tokens[k][1]] = tokens[k + 2][1]
+                    k += 3
+                else:
+                    k += 1
+            break
+    return routes
+
+_memo = {}
+
+def parse_file(path, use_cache=True):
+    # Parsed animations of one Go file. Results are cached in memory and on
+    # disk, keyed by mtime and size, with a content hash as the fallback so
+    # a touched but unchanged file is not re-parsed.
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    hit = _memo.get(path)
+    if use_cache and hit is not None and hit[0] == stamp:
+        return hit[1]
+    cache_path = os.path.join(play.cache_dir("goframes"), hashlib.sha1(path.encode("utf-8")).hexdigest() + ".pickle")
+    entry = None
+    if use_cache:
+        try:
+            with open(cache_path, "rb") as f:
+                entry = pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError, ValueError):
+            entry = None
+    if entry is not None and entry["stamp"] == stamp:
+        animations = [GoAnimation(*a) for a in entry["animations"]]
+        _memo[path] = (stamp, animations)
+        return animations
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha1(data).hexdigest()
+    if entry is not None and entry["sha1"] == digest:
+        animations = [GoAnimation(*a) for a in entry["animations"]]
+    else:
+        animations = parse_go_source(data.decode("utf-8"))
+    _memo[path] = (stamp, animations)
+    if use_cache:
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump({"stamp": stamp, "sha1": digest, "animations": [tuple(a) for a in animations]}, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache_path)
+        except OSError:
+            pass
+    return animations
+
+def load_animation(path, name=None):
+    # The named animation in a Go file, or the first one that has static
+    # frames; None if there is no such animation
+    for anim in parse_file(path):
+        if anim.frames is not None and (name is None or anim.name == name):
+            return anim
+    return None
+
+def load_frames(path, name=None):
+    anim = load_animation(path, name)
+    return anim.frames if anim is not None else []
+
+def frame_lines(frames, strip=True):
+    # Every line of every frame, in order
+    lines = []
+    for frame in frames:
+        lines.extend((frame.strip() if strip else frame.strip("\n")).split("\n"))
+    return lines
+
+def frame_files(frames_dir=None):
+    frames_dir = frames_dir or FRAMES_DIR
+    return sorted(p for p in glob.glob(os.path.join(frames_dir, "*.go")) if os.path.basename(p) != "frames.go")
+
+def collapse_holds(frames, sleep_ms=None):
+    # (frames, sleep_ms) with runs of identical frames shortened where the
+    # single Go sleep can make up for it: when every run length is a
+    # multiple of g, each run keeps 1/g of its copies and the sleep is
+    # multiplied by g, so playback is unchanged
+    runs = [(frame, len(list(group))) for frame, group in itertools.groupby(frames)]
+    g = 0
+    for _, n in runs:
+        g = math.gcd(g, n)
+    if g <= 1:
+        return frames, sleep_ms
+    frames = [frame for frame, n in runs for _ in range(n // g)]
+    return frames, (sleep_ms or DEFAULT_SLEEP_MS) * g
+
+def go_raw_string(text):
+    return "`" + text.replace("`", "` + \"`\" + `") + "`"
+
+def render_go_file(name, frames_var, frames, sleep_ms=None):
+    out = io.StringIO()
+    out.write("package frames\n\n")
+    if sleep_ms is None:
+        out.write(f"var {name} = DefaultFrameType({frames_var})\n\n")
+    else:
+        out.write('import "time"\n\n')
+        out.write(f"var {name} = FrameType{{\n")
+        out.write(f"\tGetFrame:  DefaultGetFrame({frames_var}),\n")
+        out.write(f"\tGetLength: DefaultGetLength({frames_var}),\n")
+        out.write("\tGetSleep: func() time.Duration {\n")
+        out.write(f"\t\treturn time.Millisecond * {int(round(sleep_ms))}\n")
+        out.write("\t},\n")
+        out.write("}\n\n")
+    out.write(f"var {frames_var} = []string{{\n")
+    for frame in frames:
+        out.write("\t")
+        out.write(go_raw_string(frame))
+        out.write(",\n")
+    out.write("}\n")
+    return out.getvalue()
+
+def write_go_file(path, name, frames_var, frames, sleep_ms=None):
+    content = render_go_file(name, frames_var, frames, sleep_ms)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+        f.write(content)
+    os.replace(tmp, path)
+    return len(content)
+
+def main():
+    p = argparse.ArgumentParser(description="List the animations defined in frames/*.go")
+    p.add_argument("files", nargs="*", help="Go frame files (default: every file in frames/)")
+    p.add_argument("--no-cache", action="store_true")
+    args = p.parse_args()
+    for path in args.files or frame_files():
+        for anim in parse_file(path, use_cache=not args.no_cache):
+            if anim.frames is None:
+                print(f"{os.path.basename(path)}: {anim.name} (dynamic)")
+                continue
+            width = max((len(ln) for ln in frame_lines(anim.frames, strip=False)), default=0)
+            height = max((frame.count("\n") + 1 for frame in anim.frames), default=0)
+            sleep = "?" if anim.sleep_ms is None else f"{anim.sleep_ms:g}ms"
+            print(f"{os.path.basename(path)}: {anim.name} ({anim.frames_var}) {len(anim.frames)} frames, {width}x{height}, sleep {sleep}")
+
+if __name__ == "__main__":
+    main()
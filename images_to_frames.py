@@ -0,0 +1,249 @@
+import os
+import re
+import sys
+import argparse
+import itertools
+import concurrent.futures
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "animations", "my-animation"))
+
+import play
+import split_frames
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Turns a directory of PGM/PPM images (or headerless 8-bit grayscale dumps)
+# into ASCII frames. Each image is averaged down to the target grid and its
+# brightness mapped onto a glyph ramp; workers convert whole batches at a
+# time with NumPy when it is available.
+
+IMAGE_EXTENSIONS = (".pgm", ".ppm", ".pnm", ".raw", ".gray")
+PNM_TOKEN = re.compile(rb"(?:\s|#[^\n]*\n?)*(\S+)")
+
+def image_files(source):
+    # Images in a directory, or matching a glob, in natural order
+    pattern = os.path.join(source, "*") if os.path.isdir(source) else source
+    return [p for p in play.list_frame_files(pattern) if p.lower().endswith(IMAGE_EXTENSIONS)]
+
+def parse_pnm(data):
+    # (width, height, channels, maxval, pixel values as a flat sequence)
+    magic = data[:2]
+    if magic not in (b"P2", b"P3", b"P5", b"P6"):
+        raise ValueError(f"not a PGM/PPM image (magic {magic!r})")
+    pos = 2
+    fields = []
+    for _ in range(3):
+        m = PNM_TOKEN.match(data, pos)
+        fields.append(int(m.group(1)))
+        pos = m.end()
+    width, height, maxval = fields
+    channels = 3 if magic in (b"P3", b"P6") else 1
+    count = width * height * channels
+    if magic in (b"P2", b"P3"):
+        values = [int(v) for v in data[pos:].split()[:count]]
+    else:
+        pos += 1  # the single whitespace byte after maxval
+        if maxval < 256:
+            values = data[pos:pos + count]
+        elif np is not None:
+            values = np.frombuffer(data, dtype=">u2", count=count, offset=pos)
+        else:
+            raw = data[pos:pos + 2 * count]
+            values = [(raw[i] << 8) | raw[i + 1] for i in range(0, len(raw), 2)]
+    if len(values) < count:
+        raise ValueError(f"image data is truncated ({len(values)} of {count} samples)")
+    return width, height, channels, maxval, values
+
+def load_gray(path, raw_size=None):
+    # (width, height, 8-bit luminance) of one image; a NumPy array when
+    # NumPy is available, else a bytes-like object
+    with open(path, "rb") as f:
+        data = f.read()
+    if raw_size is not None and not data.startswith((b"P2", b"P3", b"P5", b"P6")):
+        width, height = raw_size
+        if len(data) < width * height:
+            raise ValueError(f"{path}: {len(data)} bytes, expected {width * height}")
+        pixels = data[:width * height]
+        if np is not None:
+            pixels = np.frombuffer(pixels, dtype=np.uint8).reshape(height, width)
+        return width, height, pixels
+    width, height, channels, maxval, values = parse_pnm(data)
+    if np is not None:
+        if isinstance(values, bytes):
+            values = np.frombuffer(values, dtype=np.uint8)
+        arr = np.asarray(values, dtype=np.uint32).reshape(height, width, channels)
+        if channels == 3:
+            # ITU-R BT.601 luma in integer arithmetic
+            arr = (arr[..., 0] * 299 + arr[..., 1] * 587 + arr[..., 2] * 114 + 500) // 1000
+        else:
+            arr = arr[..., 0]
+        if maxval != 255:
+            arr = (arr * 255 + maxval // 2) // maxval
+        return width, height, arr.astype(np.uint8)
+    if channels == 3:
+        values = [(values[i] * 299 + values[i + 1] * 587 + values[i + 2] * 114 + 500) // 1000 for i in range(0, len(values), 3)]
+    if maxval != 255:
+        values = [(v * 255 + maxval // 2) // maxval for v in values]
+    return width, height, bytes(values)
+
+def grid_size(width, height, cols=None, rows=None, aspect=0.5):
+    # Output cells for an image. `aspect` is a cell's width over its height;
+    # terminal cells are about twice as tall as they are wide.
+    if cols and rows:
+        return cols, rows
+    if rows:
+        return max(1, int(round(width * rows / (height * aspect)))), rows
+    cols = cols or 80
+    return cols, max(1, int(round(height * cols * aspect / width)))
+
+def cell_edges(size, cells):
+    # Start of every cell's span of source pixels; spans differ by at most
+    # one pixel, and no span is empty while there are enough pixels
+    return [(i * size) // cells for i in range(cells)]
+
+def glyph_table(ramp, invert=False):
+    # Brightness 0-255 -> index into the ramp (densest glyph for the
+    # brightest pixel unless inverted)
+    n = len(ramp)
+    table = [min(n - 1, (v * n) // 256) for v in range(256)]
+    if invert:
+        table = [n - 1 - i for i in table]
+    return table
+
+def frames_from_stack(stack, cols, rows, ramp, invert):
+    # NumPy path: `stack` is (images, height, width) uint8; every image is
+    # averaged over the same cell grid and mapped in one go
+    n, height, width = stack.shape
+    cols = min(cols, width)
+    rows = min(rows, height)
+    ys = np.asarray(cell_edges(height, rows))
+    xs = np.asarray(cell_edges(width, cols))
+    sums = np.add.reduceat(np.add.reduceat(stack.astype(np.int64), ys, axis=1), xs, axis=2)
+    counts = np.diff(np.append(ys, height))[:, None] * np.diff(np.append(xs, width))[None, :]
+    levels = (2 * sums + counts) // (2 * counts)
+    glyphs = np.asarray([ord(ramp[i]) for i in glyph_table(ramp, invert)], dtype="<u4")
+    codes = glyphs[levels]
+    # Rows end in a newline, so the frame is one decode of the code points
+    newline = np.full((n, rows, 1), ord("\n"), dtype="<u4")
+    text = np.concatenate([codes, newline], axis=2).tobytes().decode("utf-32-le")
+    size = rows * (cols + 1)
+    return [text[i * size:(i + 1) * size - 1] for i in range(n)]
+
+def frame_from_bytes(pixels, width, height, cols, rows, ramp, invert):
+    # Pure-Python path for one image
+    cols = min(cols, width)
+    rows = min(rows, height)
+    table = glyph_table(ramp, invert)
+    ys = cell_edges(height, rows) + [height]
+    xs = cell_edges(width, cols) + [width]
+    lines = []
+    for r in range(rows):
+        y0, y1 = ys[r], ys[r + 1]
+        out = []
+        for c in range(cols):
+            x0, x1 = xs[c], xs[c + 1]
+            total = 0
+            for y in range(y0, y1):
+                total += sum(pixels[y * width + x0:y * width + x1])
+            count = (y1 - y0) * (x1 - x0)
+            out.append(ramp[table[(2 * total + count) // (2 * count)]])
+        lines.append("".join(out))
+    return "\n".join(lines)
+
+def convert_batch(job):
+    # Runs in a worker process: convert a list of image files to frames
+    paths, options = job
+    frames = [None] * len(paths)
+    by_shape = {}
+    for i, path in enumerate(paths):
+        width, height, pixels = load_gray(path, options["raw_size"])
+        cols, rows = grid_size(width, height, options["cols"], options["rows"], options["aspect"])
+        if np is None:
+            frames[i] = frame_from_bytes(pixels, width, height, cols, rows, options["ramp"], options["invert"])
+        else:
+            by_shape.setdefault((height, width, cols, rows), []).append((i, pixels))
+    for (height, width, cols, rows), items in by_shape.items():
+        stack = np.stack([pixels for _, pixels in items])
+        for (i, _), frame in zip(items, frames_from_stack(stack, cols, rows, options["ramp"], options["invert"])):
+            frames[i] = frame
+    return frames
+
+def convert(paths, options, jobs=None, batch=64):
+    # Frames for `paths`, in order, converted `batch` images per task
+    chunks = [(paths[i:i + batch], options) for i in range(0, len(paths), batch)]
+    if jobs == 1 or len(chunks) <= 1:
+        results = map(convert_batch, chunks)
+        yield from itertools.chain.from_iterable(results)
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        for frames in pool.map(convert_batch, chunks):
+            yield from frames
+
+def write_blob(frames, path, limit):
+    # Blank-line separated frames, the single-file format play.py reads.
+    # Rows keep their full width, so an all-dark row is spaces, not an
+    # empty line that would end the frame.
+    count = 0
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+        for frame in itertools.islice(frames, limit):
+            if count:
+                f.write("\n\n")
+            f.write(frame)
+            count += 1
+        f.write("\n")
+    os.replace(tmp, path)
+    return [path]
+
+def main():
+    p = argparse.ArgumentParser(description="Convert PGM/PPM images (or raw grayscale dumps) to ASCII frames")
+    p.add_argument("source", help="Directory of images, or a glob")
+    p.add_argument("--dir", default=None, help="Write frameNNNN.txt files to this directory")
+    p.add_argument("--blob", default=None, help="Write one blank-line separated file instead")
+    p.add_argument("--pack", default=None, help="Write a frame pack instead")
+    p.add_argument("--prefix", default="frame")
+    p.add_argument("--pad", type=int, default=4)
+    p.add_argument("--limit", type=int, default=None, help="Convert at most this many images")
+    p.add_argument("--width", type=int, default=None, help="Frame width in characters (default: 80, or from --height)")
+    p.add_argument("--height", type=int, default=None, help="Frame height in lines (default: from the width and --aspect)")
+    p.add_argument("--aspect", type=float, default=0.5, help="Width over height of a terminal cell")
+    p.add_argument("--ramp", default=play.DEFAULT_RAMP, help="Glyphs from lightest to densest")
+    p.add_argument("--invert", action="store_true", help="Map bright pixels to light glyphs (for dark-on-light terminals)")
+    p.add_argument("--raw", type=play.parse_term_size, default=None, metavar="WxH", help="Read files without a PNM header as 8-bit grayscale of this size")
+    p.add_argument("--fps", type=float, default=0.0, help="Frame rate recorded in a --pack header")
+    p.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    p.add_argument("--batch", type=int, default=64, help="Images per worker task")
+    args = p.parse_args()
+
+    if len(args.ramp) < 2:
+        p.error("--ramp needs at least two glyphs")
+    if sum(x is not None for x in (args.dir, args.blob, args.pack)) != 1:
+        p.error("choose exactly one of --dir, --blob and --pack")
+    paths = image_files(args.source)[:args.limit]
+    if not paths:
+        p.error(f"no images found in {args.source}")
+    options = {
+        "cols": args.width,
+        "rows": args.height,
+        "aspect": args.aspect,
+        "ramp": args.ramp,
+        "invert": args.invert,
+        "raw_size": args.raw,
+    }
+    frames = convert(paths, options, args.jobs, max(1, args.batch))
+    if args.dir:
+        out = split_frames.write_frames(frames, args.dir, args.prefix, args.pad, args.limit)
+        print(f"wrote {len(out)} frames to {args.dir}")
+    elif args.blob:
+        write_blob(frames, args.blob, args.limit)
+        print(f"wrote {len(paths)} frames to {args.blob}")
+    else:
+        split_frames.write_pack(frames, args.pack, args.limit, args.fps, 30)
+        print(f"wrote {len(paths)} frames to {args.pack}")
+
+if __name__ == "__main__":
+    main()
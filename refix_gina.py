@@ -1,61 +1,53 @@
 import os
+import argparse
 
-def refix_gina():
-    input_path = r"c:\Users\mohit\ascii-live\frames\gina.go"
-    
-    with open(input_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    # Extract content between backticks
-    parts = content.split('`')
-    all_lines = []
-    # The odd indices should be the frames (1, 3, 5...)
-    for i in range(1, len(parts), 2):
-        frame_str = parts[i]
-        # Split by newline
-        lines = frame_str.strip('\n').split('\n') 
-        # Note: split('\n') might give an empty string at end if trailing newline
-        # But looking at previous output, the lines seemed clean.
-        # Let's be careful.
-        # In fix_gina.py, I joined with \n.
-        # So split('\n') should recover them.
-        all_lines.extend(lines)
-        
+import goframes
+from detect_frame_height import MIN_CONFIDENCE, detect_frame_height
+
+def refix_gina(input_path=None, frame_height=None):
+    input_path = input_path or os.path.join(goframes.FRAMES_DIR, "gina.go")
+
+    anim = goframes.load_animation(input_path)
+    if anim is None:
+        print(f"No frames found in {input_path}.")
+        return
+    all_lines = goframes.frame_lines(anim.frames, strip=False)
     print(f"Total lines extracted: {len(all_lines)}")
-    
-    frame_height = 97
+
+    if frame_height is None:
+        frame_height, confidence = detect_frame_height(all_lines)
+        if frame_height is None:
+            print("Could not detect a frame height.")
+            return
+        print(f"Detected frame height {frame_height} (confidence {confidence:.2f})")
+        if confidence < MIN_CONFIDENCE:
+            print("Confidence too low to rewrite the file; pass --height to choose one.")
+            return
+
     frames = []
     current_frame = []
-    
+
     for line in all_lines:
         current_frame.append(line)
         if len(current_frame) == frame_height:
             frames.append("\n".join(current_frame))
             current_frame = []
-            
+
     if current_frame:
-        print(f"Warning: {len(current_frame)} lines leftover.")
-        
+        print(f"{len(all_lines)} lines don't split into frames of {frame_height} ({len(current_frame)} left over); not rewriting.")
+        return
+
     print(f"Created {len(frames)} frames.")
 
-    # Construct Go file content
-    go_content = "package frames\n\n"
-    go_content += "var Gina = DefaultFrameType(GinaFrames)\n\n"
-    go_content += "var GinaFrames = []string{\n"
-    
-    for frame in frames:
-        # Escape backticks if any
-        if "`" in frame:
-            frame = frame.replace("`", "` + \"`\" + `")
-            
-        go_content += "\t`\n" + frame + "\n`,\n"
-        
-    go_content += "}\n"
-    
-    with open(input_path, 'w', encoding='utf-8') as f:
-        f.write(go_content)
-    
-    print("Successfully updated gina.go")
+    # Each frame keeps its art on its own lines between the backticks
+    goframes.write_go_file(input_path, anim.name, anim.frames_var or anim.name + "Frames",
+                           ["\n" + frame + "\n" for frame in frames], anim.sleep_ms)
+
+    print(f"Successfully updated {os.path.basename(input_path)}")
 
 if __name__ == "__main__":
-    refix_gina()
+    p = argparse.ArgumentParser(description="Re-chunk the lines of a Go frame file into frames of equal height")
+    p.add_argument("path", nargs="?", default=None, help="Go frame file (default: frames/gina.go)")
+    p.add_argument("--height", type=int, default=None, help="Frame height (default: detected)")
+    args = p.parse_args()
+    refix_gina(args.path, args.height)
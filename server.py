@@ -0,0 +1,200 @@
+import os
+import sys
+import json
+import asyncio
+import logging
+import argparse
+import datetime
+
+import goframes
+import build_frames
+
+# Python counterpart of main.go: same routes and responses, but every
+# animation has a single ticker that encodes each frame once and hands the
+# same bytes to all of its viewers.
+
+NOT_FOUND_MESSAGE = {"error": "You almost ruined a good surprise. Come on, curl it in terminal."}
+NOT_CURLED_MESSAGE = {"error": "You almost ruined a good surprise. Come on, curl it in terminal."}
+CLEAR_SCREEN = "\033[2J\033[H"
+
+log = logging.getLogger("ascii-live")
+
+def chunk(data):
+    # One HTTP/1.1 chunk of a Transfer-Encoding: chunked body
+    return b"%x\r\n" % len(data) + data + b"\r\n"
+
+def clock_frame(i):
+    # Go's time.RFC3339: like isoformat, but UTC is written as "Z"
+    stamp = datetime.datetime.now().astimezone().isoformat(timespec="seconds")
+    return stamp[:-6] + "Z" if stamp.endswith("+00:00") else stamp
+
+class Channel:
+    # One animation being broadcast. The ticker runs only while somebody is
+    # watching; frames are encoded on first use and shared by every viewer.
+    def __init__(self, name, frames=None, get_frame=None, sleep_ms=goframes.DEFAULT_SLEEP_MS):
+        self.name = name
+        self.frames = frames
+        self.get_frame = get_frame
+        self.sleep = (sleep_ms or goframes.DEFAULT_SLEEP_MS) / 1000.0
+        self.encoded = None
+        self.viewers = set()
+        self.task = None
+
+    def encode(self, i):
+        if self.frames is None:
+            return chunk((CLEAR_SCREEN + self.get_frame(i) + "\n").encode("utf-8"))
+        if self.encoded is None:
+            self.encoded = [chunk((CLEAR_SCREEN + frame + "\n").encode("utf-8")) for frame in self.frames]
+        return self.encoded[i % len(self.encoded)]
+
+    def subscribe(self, viewer):
+        self.viewers.add(viewer)
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self.run())
+
+    def unsubscribe(self, viewer):
+        self.viewers.discard(viewer)
+        if not self.viewers and self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        i = 0
+        while True:
+            deadline += self.sleep
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+            data = self.encode(i)
+            for viewer in self.viewers:
+                viewer.offer(data)
+            i = i + 1 if self.frames is None else (i + 1) % len(self.frames)
+
+class Viewer:
+    # Per-connection bounded buffer. A reader that can't keep up loses its
+    # oldest queued frames instead of holding up the ticker.
+    def __init__(self, max_frames):
+        self.queue = asyncio.Queue(max_frames)
+        self.dropped = 0
+
+    def offer(self, data):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(data)
+
+def load_channels(frames_dir=None, animations_dir=None):
+    channels = {}
+    by_var = {}
+    for path in goframes.frame_files(frames_dir):
+        for anim in goframes.parse_file(path):
+            by_var[anim.name] = anim
+    frames_go = os.path.join(frames_dir or goframes.FRAMES_DIR, "frames.go")
+    for route, var in goframes.parse_frame_map(frames_go).items():
+        anim = by_var.get(var)
+        if anim is None:
+            log.warning("FrameMap entry %s: no animation named %s", route, var)
+        elif anim.frames is not None:
+            channels[route] = Channel(route, frames=anim.frames, sleep_ms=anim.sleep_ms)
+        elif var == "Clock":
+            channels[route] = Channel(route, get_frame=clock_frame, sleep_ms=anim.sleep_ms)
+    if animations_dir:
+        for route, source in build_frames.find_sources(animations_dir).items():
+            frames, sleep_ms = build_frames.load_source(source)
+            if frames:
+                channels.setdefault(route, Channel(route, frames=frames, sleep_ms=sleep_ms))
+    return channels
+
+class Server:
+    def __init__(self, channels, max_frames=4):
+        self.channels = channels
+        self.max_frames = max_frames
+
+    async def respond_json(self, writer, status, reason, body):
+        data = json.dumps(body).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            "Connection: close\r\n\r\n".encode("ascii") + data
+        )
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        lines = head.decode("latin-1").split("\r\n")
+        parts = lines[0].split(" ")
+        method, path = (parts[0], parts[1]) if len(parts) >= 2 else ("", "/")
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        path = path.split("?", 1)[0]
+        name = path.strip("/")
+        try:
+            if method != "GET":
+                await self.respond_json(writer, 405, "Method Not Allowed", NOT_FOUND_MESSAGE)
+            elif path == "/list":
+                await self.respond_json(writer, 200, "OK", {"frames": sorted(self.channels)})
+            elif "/" in name or name not in self.channels:
+                await self.respond_json(writer, 404, "Not Found", NOT_FOUND_MESSAGE)
+            elif "curl" not in headers.get("user-agent", ""):
+                await self.respond_json(writer, 417, "Expectation Failed", NOT_CURLED_MESSAGE)
+            else:
+                log.info("Frame source %s", name)
+                await self.stream(self.channels[name], reader, writer)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def stream(self, channel, reader, writer):
+        writer.write(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n")
+        viewer = Viewer(self.max_frames)
+        channel.subscribe(viewer)
+
+        async def pump():
+            while True:
+                writer.write(await viewer.queue.get())
+                await writer.drain()
+
+        sender = asyncio.ensure_future(pump())
+        # Anything read (or EOF) after the request means the client is gone
+        closed = asyncio.ensure_future(reader.read(1))
+        try:
+            await asyncio.wait({sender, closed}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            channel.unsubscribe(viewer)
+            sender.cancel()
+            closed.cancel()
+            log.info("Client stopped listening (%d frames dropped)", viewer.dropped)
+
+async def serve(host, port, channels, max_frames):
+    server = Server(channels, max_frames)
+    srv = await asyncio.start_server(server.handle, host, port)
+    log.info("Serving %d animations on port %d...", len(channels), port)
+    async with srv:
+        await srv.serve_forever()
+
+def main():
+    p = argparse.ArgumentParser(description="Stream ASCII animations to curl clients")
+    p.add_argument("--host", default="")
+    p.add_argument("--port", type=int, default=int(os.environ.get("PORT") or 8080))
+    p.add_argument("--frames-dir", default=None, help="Directory of Go frame files (default: frames/)")
+    p.add_argument("--animations", default=None, help="Also serve the animation sources in this directory")
+    p.add_argument("--buffer", type=int, default=4, help="Frames buffered per client before the oldest are dropped")
+    args = p.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr, format="%(asctime)s %(message)s")
+    channels = load_channels(args.frames_dir, args.animations)
+    try:
+        asyncio.run(serve(args.host or None, args.port, channels, max(1, args.buffer)))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()